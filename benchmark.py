@@ -0,0 +1,336 @@
+"""
+Microbenchmarks of the training code, run on the real corpus and on
+synthetic corpora scaled from it, so every performance change can be
+measured before and after, and so we know where the code stops scaling.
+
+Covered: corpus load (cold, without snapshot, and warm), question
+selection for each session mode, check_field() grading (exact, near-miss,
+forbidden and wrong responses) one by one and as a batch (check_fields()),
+progress journal writes and replay, answer event writes and the progress
+report over them (when NumPy is installed), and PDF table generation (when
+reportlab is installed).
+
+A synthetic corpus of scale N holds N copies of every word of
+all_hiragana_with_pos.csv, each copy with its own meaning (and its own
+id, from its occurrence), next to the same kanji.json. Every corpus is built in a temporary
+directory: the snapshot and progress of the working copy are never touched.
+
+Results are written as JSON; --compare prints the ratio of every median
+to the one of a previous run.
+
+Usage:
+    python benchmark.py [--scales 1 10 100] [--repeat 5] [--output benchmark.json]
+                        [--compare previous.json]
+"""
+
+import argparse
+import csv
+import io
+import json
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import events
+import snapshot
+from progress import Journal
+from training import Corpus, Session, Word, check_field, check_fields
+
+WORDS_FILE, _ = snapshot.SECTIONS["words"]
+KANJI_FILE, _ = snapshot.SECTIONS["kanji"]
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_OUTPUT = "benchmark.json"
+# A benchmark stops repeating once it has run for this long.
+TIME_BUDGET = 30.0
+# Above this many rows, reportlab needs minutes per document: skipped.
+PDF_MAX_ROWS = 20000
+GRADING_SAMPLE = 200
+PROGRESS_WRITES = 1000
+REPORT_EVENTS = 300000
+
+SESSION_MODES = {
+    "vocabulary_words": {"mode": "v", "test": "w"},
+    "vocabulary_kanji": {"mode": "v", "test": "k"},
+    "vocabulary_both": {"mode": "v", "test": "b"},
+    "vocabulary_verbs_meaning": {"mode": "v", "test": "w", "pos": "verb", "exercise": 1},
+    "top_used_verbs": {"mode": "t", "exercise": 1},
+    "interview": {"mode": "i", "exercise": 1},
+}
+
+
+def make_corpus(target: Path, scale: int, source: Path = Path(".")) -> None:
+    """Write a corpus holding scale copies of every word of source into target."""
+    target.mkdir(parents=True, exist_ok=True)
+    with open(source / WORDS_FILE, newline='', encoding='utf-8') as fin, \
+            open(target / WORDS_FILE, "w", newline='', encoding='utf-8') as fout:
+        reader = csv.reader(fin)
+        writer = csv.writer(fout, lineterminator="\n")
+        writer.writerow(next(reader))
+        rows = list(reader)
+        for copy in range(scale):
+            for row in rows:
+                if copy:
+                    row = row[:3] + [f"{row[3]}; variant {copy}"] + row[4:]
+                writer.writerow(row)
+    if (source / KANJI_FILE).exists():
+        shutil.copyfile(source / KANJI_FILE, target / KANJI_FILE)
+    else:
+        _write_kanji_from_words(target)
+
+
+def _write_kanji_from_words(target: Path) -> None:
+    """Stand-in kanji.json (one entry per kanji used by a word) for a checkout
+    without the kanji data, so the word benchmarks still have kanji to join."""
+    kanji = {}
+    with open(target / WORDS_FILE, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            level = int(row[4].replace("JLPT_", ""))
+            for letter in row[0]:
+                if "一" <= letter <= "鿿" and letter not in kanji:
+                    kanji[letter] = {"strokes": 1, "grade": None, "freq": None, "jlpt_old": level,
+                                     "jlpt_new": level, "meanings": [letter], "wk_radicals": None}
+    with open(target / KANJI_FILE, "w", encoding="utf-8") as f:
+        json.dump(kanji, f, ensure_ascii=False)
+
+
+def measure(results: list[dict], name: str, scale: int, func, repeat: int, setup=None, ops: int = 1) -> None:
+    """Time func() repeat times (setup() runs before each, untimed) and
+    record the per-operation time; ops is the number of operations func does."""
+    times = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) / ops)
+        if time.perf_counter() - started > TIME_BUDGET:
+            break
+    result = {"name": name, "scale": scale, "runs": len(times), "ops": ops,
+              "min": min(times), "median": statistics.median(times), "mean": statistics.mean(times)}
+    results.append(result)
+    print(f"  {name:<40} x{scale:<4} median {_format_time(result['median'])}"
+          f"  min {_format_time(result['min'])}  ({len(times)} runs)")
+
+
+def skip(results: list[dict], name: str, scale: int, reason: str) -> None:
+    results.append({"name": name, "scale": scale, "skipped": reason})
+    print(f"  {name:<40} x{scale:<4} skipped: {reason}")
+
+
+def _format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.3f} s "
+
+
+def _loaded_corpus(root: Path) -> Corpus:
+    corpus = Corpus(root)
+    corpus.word_index
+    corpus.kanji_index
+    return corpus
+
+
+def bench_corpus_load(results: list[dict], root: Path, scale: int, repeat: int) -> None:
+    snapshot_path = root / snapshot.SNAPSHOT_FILE
+    measure(results, "corpus_load_cold", scale, lambda: _loaded_corpus(root), repeat,
+            setup=lambda: snapshot_path.unlink(missing_ok=True))
+    measure(results, "corpus_load_warm", scale, lambda: _loaded_corpus(root), repeat)
+
+
+def bench_sessions(results: list[dict], corpus: Corpus, scale: int, repeat: int) -> None:
+    for name, options in SESSION_MODES.items():
+        exercise = options.get("exercise")
+        word_field = None if exercise is None else Word.fields()[exercise - 1]
+
+        def build():
+            Session.from_options(corpus, options["mode"], options.get("test", "w"), options.get("pos", "all"),
+                                 word_field, None).start()
+
+        measure(results, "session_build_" + name, scale, build, repeat)
+
+
+def grading_cases(words: list[Word], sample: int = GRADING_SAMPLE) -> dict[str, list[tuple]]:
+    """check_field() arguments for exact, near-miss, forbidden and wrong
+    (another word's meaning) responses about the meaning of a random sample
+    of words."""
+    rng = random.Random(0)
+    cases = {"exact": [], "near_miss": [], "forbidden": []}
+    for word in rng.sample(words, min(sample, len(words))):
+        solutions = re.sub(r'\s*\(.*?\)\s*', '', word.meaning).split(";") + [""]
+        answer = rng.choice([solution for solution in solutions if solution] or [word.meaning])
+        near_miss = answer[:-2] + answer[-1:] + "s" if len(answer) > 2 else answer + "es"
+        cases["exact"].append((answer, solutions, [""], False))
+        cases["near_miss"].append((near_miss, solutions, [""], False))
+        cases["forbidden"].append((near_miss, solutions, ["", answer + "s"], False))
+    other = random.Random(1)
+    cases["wrong"] = [(other.choice(words).meaning, solutions, forbids, should_be_exact)
+                      for _, solutions, forbids, should_be_exact in cases["exact"]]
+    return cases
+
+
+def bench_grading(results: list[dict], corpus: Corpus, scale: int, repeat: int) -> None:
+    for name, cases in grading_cases(corpus.words).items():
+        measure(results, "check_field_" + name, scale,
+                lambda: [check_field(*case) for case in cases], repeat, ops=len(cases))
+        measure(results, "check_fields_" + name, scale, lambda: check_fields(cases), repeat, ops=len(cases))
+
+
+def bench_progress(results: list[dict], corpus: Corpus, scale: int, repeat: int) -> None:
+    ids = [word.id for word in corpus.words]
+    directory = Path(tempfile.mkdtemp(prefix="progress-", dir=corpus.root))
+    path = directory / "word_result_meaning.journal"
+
+    opened = []
+
+    def fill():
+        # One result per word, as after going through the whole corpus once.
+        path.unlink(missing_ok=True)
+        journal = Journal(path)
+        for item_id in ids:
+            journal.set(item_id, 1)
+        journal.compact()
+        opened[:] = [journal]
+
+    def write():
+        journal = opened[0]
+        for item_id in ids[:PROGRESS_WRITES]:
+            journal.set(item_id, journal.get(item_id, 0) + 1)
+        journal.close()
+
+    fill()
+    opened[0].close()
+    measure(results, "progress_replay", scale, lambda: Journal(path).close(), repeat)
+    measure(results, "progress_write", scale, write, repeat, setup=fill, ops=min(PROGRESS_WRITES, len(ids)))
+    shutil.rmtree(directory)
+
+
+def bench_events(results: list[dict], corpus: Corpus, scale: int, repeat: int) -> None:
+    """Answer event writes, and the report over REPORT_EVENTS answers to
+    random words spread over three months."""
+    directory = Path(tempfile.mkdtemp(prefix="events-", dir=corpus.root))
+    log = events.EventLog(directory / events.EVENTS_FILE)
+    rng = random.Random(0)
+    words = corpus.words
+    timestamp = time.time() - 90 * 86400
+    for _ in range(REPORT_EVENTS):
+        timestamp += rng.expovariate(1 / 25)
+        log.append(rng.choice(words).id, rng.choice(["meaning", "romaji"]), rng.random() < 0.7, rng.random(),
+                   rng.expovariate(1 / 5), timestamp=timestamp)
+    measure(results, "events_write", scale,
+            lambda: [log.append(word.id, "meaning", True, 1.0, 1.0) for word in words[:PROGRESS_WRITES]],
+            repeat, ops=min(PROGRESS_WRITES, len(words)))
+    log.close()
+    try:
+        import numpy
+    except ImportError:
+        skip(results, "events_report", scale, "NumPy is not installed")
+    else:
+        measure(results, "events_report", scale, lambda: events.report(log.read(), corpus), repeat)
+    shutil.rmtree(directory)
+
+
+def bench_pdf(results: list[dict], corpus: Corpus, scale: int, repeat: int) -> None:
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate
+        import generate_jlpt_pdf
+    except ImportError:
+        skip(results, "pdf_table", scale, "reportlab is not installed")
+        return
+    session = Session.from_options(corpus, "v", "w")
+    session.start()
+    words = generate_jlpt_pdf.collect_words(session)
+    if len(words) > PDF_MAX_ROWS:
+        skip(results, "pdf_table", scale, f"{len(words)} rows, more than {PDF_MAX_ROWS}")
+        return
+    try:
+        generate_jlpt_pdf.register_japanese_font()
+        font = generate_jlpt_pdf.JAPANESE_FONT
+    except Exception:
+        # Font path of the author's machine: time the layout with a built-in font.
+        font = "Helvetica"
+
+    def build():
+        SimpleDocTemplate(io.BytesIO(), pagesize=A4).build(generate_jlpt_pdf.build_story(words, font))
+
+    measure(results, "pdf_table", scale, build, repeat)
+
+
+def run(scales: list[int], repeat: int) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="jlpt-benchmark-") as tmp:
+        for scale in scales:
+            root = Path(tmp) / f"x{scale}"
+            make_corpus(root, scale)
+            print(f"Corpus x{scale}:")
+            bench_corpus_load(results, root, scale, repeat)
+            corpus = _loaded_corpus(root)
+            bench_sessions(results, corpus, scale, repeat)
+            bench_grading(results, corpus, scale, repeat)
+            bench_progress(results, corpus, scale, repeat)
+            bench_events(results, corpus, scale, repeat)
+            bench_pdf(results, corpus, scale, repeat)
+            shutil.rmtree(root)
+    return results
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(results: list[dict], previous_path: Path) -> None:
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {(result["name"], result["scale"]): result for result in previous["results"] if "median" in result}
+    print(f"\nCompared to {previous_path} (commit {previous['meta'].get('commit')}):")
+    for result in results:
+        old = before.get((result["name"], result["scale"]))
+        if old is None or "median" not in result:
+            continue
+        print(f"  {result['name']:<40} x{result['scale']:<4} {_format_time(old['median'])} -> "
+              f"{_format_time(result['median'])}  ({result['median'] / old['median']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark corpus loading, sessions, grading, progress and PDF.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="corpus sizes, as multiples of the real word list")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=Path(DEFAULT_OUTPUT))
+    parser.add_argument("--compare", type=Path, help="results of a previous run")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare is not None:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Build the runtime corpus from all.csv and kanji.json in one streaming pass.
+
+This replaces the adapt.py -> create_hiragana.py -> part of speech merge
+chain and its intermediate files. all.csv is read once with the csv
+module (quoted fields with commas are parsed, not patched) and every row
+goes through a chain of generator stages:
+
+    read_source -> normalize -> curate -> add_part_of_speech -> add_romaji
+                -> write_csv -> snapshot
+
+Only the current row (and one batch of rows waiting for cutlet) is in
+memory; the side tables (curated rows, parts of speech, romaji cache) are
+keyed lookups.
+
+all_hiragana_with_pos.csv is edited by hand (tags, transitivity,
+corrected readings and meanings, added words), so the previous build is
+the curation layer: a source row already present there keeps its curated
+row, rows added by hand are kept after the source rows, and only new source
+rows get their part of speech (from all_patched_with_pos.csv) and romaji
+computed. The output replaces all_hiragana_with_pos.csv atomically and
+the words section of the snapshot is compiled from the same rows, without
+reading the file again.
+
+Rows that cannot be used are not dropped silently: each one is reported
+with its line number and the reason.
+
+Usage:
+    python build_corpus.py [--jobs N] [--strict]
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import snapshot
+from romaji import RomajiCache
+
+SOURCE_FILE = "all.csv"
+POS_FILE = "all_patched_with_pos.csv"
+OUTPUT_FILE, _ = snapshot.SECTIONS["words"]
+KANJI_FILE, _ = snapshot.SECTIONS["kanji"]
+
+HEADER = ["expression", "reading", "romaji", "meaning", "tags", "kinds", "tags", "transitivity"]
+ROMAJI_BATCH = 2000
+DEFAULT_KIND = "other"
+
+_JLPT_PATTERN = re.compile(r"JLPT_N?(\d+)")
+
+# Row = [expression, reading, romaji, meaning, jlpt, kinds, tags, transitivity]
+# as in all_hiragana_with_pos.csv; romaji and kinds are None until computed.
+Row = list
+
+
+class Report:
+    """Problems found while building, by source line."""
+
+    def __init__(self):
+        self.problems: list[tuple[str, int, str]] = []
+        self.counts = {"source": 0, "curated": 0, "added_by_hand": 0, "new": 0}
+
+    def add(self, source: str, line: int, message: str) -> None:
+        self.problems.append((source, line, message))
+
+    def print(self) -> None:
+        for source, line, message in self.problems:
+            print(f"{source}:{line}: {message}", file=sys.stderr)
+        print(f"{self.counts['source']} source row(s): {self.counts['curated']} kept as curated, "
+              f"{self.counts['new']} new; {self.counts['added_by_hand']} row(s) added by hand kept; "
+              f"{len(self.problems)} problem(s).")
+
+
+def read_source(path: Path, report: Report) -> Iterator[tuple[int, list[str]]]:
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        try:
+            next(reader)  # header
+            for row in reader:
+                if row:
+                    yield reader.line_num, row
+        except csv.Error as error:
+            report.add(path.name, reader.line_num, f"unreadable CSV, build stopped here ({error})")
+
+
+def normalize(rows: Iterable[tuple[int, list[str]]], report: Report,
+              source: str = SOURCE_FILE) -> Iterator[tuple[int, Row]]:
+    """[expression, reading, meaning, tags] -> Row with the meanings separated
+    by ';' and the first JLPT level of the tags as JLPT_<n>."""
+    for line, row in rows:
+        if len(row) != 4:
+            report.add(source, line, f"expected 4 fields, got {len(row)}: {row}")
+            continue
+        expression, reading, meaning, tags = (field.strip() for field in row)
+        if not expression or not meaning:
+            report.add(source, line, f"empty expression or meaning: {row}")
+            continue
+        match = _JLPT_PATTERN.search(tags)
+        if match is None:
+            report.add(source, line, f"no JLPT level in tags '{tags}'")
+            continue
+        report.counts["source"] += 1
+        yield line, [expression, reading, None, meaning.replace(",", ";"), f"JLPT_{match.group(1)}",
+                     None, "", ""]
+
+
+class CuratedRows:
+    """Rows of the previous build, found from a source row by (expression,
+    reading), then (expression, meaning), then (reading, meaning) since
+    curation may have fixed any of them."""
+
+    def __init__(self, path: Path):
+        self.rows: list[Row] = []
+        if path.exists():
+            with open(path, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                next(reader)
+                self.rows = [row for row in reader if len(row) == len(HEADER)]
+        self.used = [False] * len(self.rows)
+        self._keys: list[dict[tuple[str, str], int]] = [{}, {}, {}]
+        for index, row in enumerate(self.rows):
+            for keys, key in zip(self._keys, self._row_keys(row[0], row[1], row[3])):
+                keys.setdefault(key, index)
+
+    @staticmethod
+    def _row_keys(expression: str, reading: str, meaning: str) -> tuple[tuple[str, str], ...]:
+        return (expression, reading), (expression, meaning), (reading or expression, meaning)
+
+    def take(self, row: Row) -> Row | None:
+        for keys, key in zip(self._keys, self._row_keys(row[0], row[1], row[3])):
+            index = keys.get(key)
+            if index is not None and not self.used[index]:
+                self.used[index] = True
+                return self.rows[index]
+        return None
+
+    def left_over(self) -> Iterator[Row]:
+        return (row for row, used in zip(self.rows, self.used) if not used)
+
+
+def curate(rows: Iterable[tuple[int, Row]], curated: CuratedRows, report: Report) -> Iterator[tuple[int, Row]]:
+    for line, row in rows:
+        curated_row = curated.take(row)
+        if curated_row is not None:
+            report.counts["curated"] += 1
+            yield line, curated_row
+        else:
+            report.counts["new"] += 1
+            yield line, row
+    for row in curated.left_over():
+        report.counts["added_by_hand"] += 1
+        yield 0, row
+
+
+def load_parts_of_speech(path: Path) -> dict[tuple[str, str], str]:
+    """(expression, reading) -> part of speech, from all_patched_with_pos.csv."""
+    if not path.exists():
+        return {}
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return {(row[0], row[1]): row[4] for row in reader if len(row) == 5}
+
+
+def add_part_of_speech(rows: Iterable[tuple[int, Row]], parts_of_speech: dict[tuple[str, str], str],
+                       report: Report, source: str = SOURCE_FILE) -> Iterator[tuple[int, Row]]:
+    for line, row in rows:
+        if row[5] is None:
+            kind = parts_of_speech.get((row[0], row[1]))
+            if kind is None:
+                report.add(source, line, f"no part of speech for {row[0]} ({row[1]}), '{DEFAULT_KIND}' used")
+                kind = DEFAULT_KIND
+            row[5] = kind
+        yield line, row
+
+
+def add_romaji(rows: Iterable[tuple[int, Row]], cache: RomajiCache,
+               batch_size: int = ROMAJI_BATCH) -> Iterator[tuple[int, Row]]:
+    """Romaji of the rows that have none, converted a batch at a time so
+    cutlet runs on many readings at once, in order."""
+    batch = []
+    for line, row in rows:
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            yield from _romaji_batch(batch, cache)
+            batch = []
+    yield from _romaji_batch(batch, cache)
+
+
+def _romaji_batch(batch: list[tuple[int, Row]], cache: RomajiCache) -> Iterator[tuple[int, Row]]:
+    cache.convert([row[1] or row[0] for _, row in batch if row[2] is None])
+    for line, row in batch:
+        if row[2] is None:
+            row[2] = cache[row[1] or row[0]]
+        yield line, row
+
+
+def write_csv(rows: Iterable[tuple[int, Row]], path: Path) -> Iterator[Row]:
+    """Write the rows to path while passing them on."""
+    with open(path, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(HEADER)
+        for _, row in rows:
+            writer.writerow(row)
+            yield row
+
+
+def build(root: Path = Path("."), jobs: int | None = None) -> Report:
+    report = Report()
+    output = root / OUTPUT_FILE
+    tmp_output = output.with_name(output.name + ".tmp")
+    cache = RomajiCache(root / ".romaji_cache.json", jobs)
+    try:
+        rows = read_source(root / SOURCE_FILE, report)
+        rows = normalize(rows, report)
+        rows = curate(rows, CuratedRows(output), report)
+        rows = add_part_of_speech(rows, load_parts_of_speech(root / POS_FILE), report)
+        rows = add_romaji(rows, cache)
+        columns = snapshot.compile_word_rows(write_csv(rows, tmp_output))
+    except BaseException:
+        tmp_output.unlink(missing_ok=True)
+        raise
+    finally:
+        cache.close()
+    os.replace(tmp_output, output)
+    snapshot.store("words", columns, root)
+    if (root / KANJI_FILE).exists():
+        snapshot.load("kanji", root, rebuild=True)
+    else:
+        report.add(KANJI_FILE, 0, "missing, kanji section not built")
+    try:
+        snapshot.load("distractors", root, rebuild=True)
+    except ImportError as error:
+        report.add(OUTPUT_FILE, 0, f"distractors section not built: {error}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Build {OUTPUT_FILE} and the corpus snapshot from {SOURCE_FILE}.")
+    parser.add_argument("--jobs", type=int, default=None, help="cutlet worker processes (default: one per CPU)")
+    parser.add_argument("--strict", action="store_true", help="exit with an error when a row was reported")
+    args = parser.parse_args()
+
+    report = build(jobs=args.jobs)
+    report.print()
+    return 1 if args.strict and report.problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Nearest neighbours of every word, the distractors of multiple choice
+questions.
+
+They are computed once, when the snapshot is built (see snapshot.py), with
+NumPy (imported only then). Each word gets a feature vector made of four
+hashed, L2 normalized parts, each scaled by its weight:
+
+- the character trigrams of its meanings (words that mean nearly the same);
+- its kanji (words written alike);
+- the bigrams of its kana (words that sound alike);
+- its parts of speech.
+
+The dot product of two vectors is then the weighted sum of the cosine
+similarities of the parts, and the neighbours of a word are the
+NEIGHBOURS words of the same JLPT level with the highest one, found with
+one matrix product per block of rows. At question time, picking the
+distractors of a word is a lookup in that table.
+"""
+
+import re
+import zlib
+
+from kana import to_hiragana
+from search import trigrams
+
+NEIGHBOURS = 16
+# Part -> (hashed dimensions, weight).
+PARTS = {"meaning": (1024, 1.0), "kanji": (512, 0.6), "kana": (512, 0.3), "kinds": (32, 0.5)}
+# Rows of the similarity matrix computed at once.
+BLOCK_ROWS = 1024
+
+
+def word_features(word: str, kana: str, meaning: str, kinds: tuple[str, ...]) -> dict[str, set[str]]:
+    """The keys hashed into each part of the feature vector of a word."""
+    kana = to_hiragana(re.sub(r'\s*\(.*?\)\s*', '', kana).replace(" ", ""))
+    return {
+        "meaning": {gram for text in re.sub(r'\s*\(.*?\)\s*', ' ', meaning).split(";") for gram in trigrams(text)},
+        "kanji": {char for char in word if "一" <= char <= "鿿"},
+        "kana": {kana[index:index + 2] for index in range(len(kana) - 1)} or {kana},
+        "kinds": {kind for kind in kinds if kind},
+    }
+
+
+def feature_matrix(columns: dict[str, list]):
+    """Weighted feature vectors of the words of the columns of the words section, one row each."""
+    import numpy as np
+
+    features = [word_features(word, kana, meaning, kinds) for word, kana, meaning, kinds
+                in zip(columns["word"], columns["kana"], columns["meaning"], columns["kinds"])]
+    blocks = []
+    for part, (dimensions, weight) in PARTS.items():
+        rows, cols = [], []
+        for row, keys in enumerate(features):
+            for key in keys[part]:
+                rows.append(row)
+                cols.append(zlib.crc32(key.encode("utf-8")) % dimensions)
+        block = np.zeros((len(features), dimensions), dtype=np.float32)
+        block[rows, cols] = 1.0
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        blocks.append(block * (weight / np.maximum(norms, 1e-12)))
+    return np.hstack(blocks)
+
+
+def nearest_neighbours(columns: dict[str, list], count: int = NEIGHBOURS) -> list[tuple[int, ...]]:
+    """Indexes of the count nearest words of the same JLPT level of each
+    word of the columns of the words section, nearest first."""
+    import numpy as np
+
+    matrix = feature_matrix(columns)
+    levels = np.asarray(columns["jlpt_level"])
+    neighbours: list[tuple[int, ...]] = [()] * len(levels)
+    for level in np.unique(levels):
+        members = np.flatnonzero(levels == level)
+        keep = min(count, len(members) - 1)
+        if keep <= 0:
+            continue
+        vectors = matrix[members]
+        for start in range(0, len(members), BLOCK_ROWS):
+            similarities = vectors[start:start + BLOCK_ROWS] @ vectors.T
+            rows = np.arange(len(similarities))
+            similarities[rows, rows + start] = -np.inf
+            nearest = np.argpartition(-similarities, keep - 1, axis=1)[:, :keep]
+            order = np.argsort(-np.take_along_axis(similarities, nearest, axis=1), axis=1, kind="stable")
+            nearest = members[np.take_along_axis(nearest, order, axis=1)]
+            for row, word_neighbours in zip(members[start:start + BLOCK_ROWS], nearest.tolist()):
+                neighbours[row] = tuple(word_neighbours)
+    return neighbours
@@ -0,0 +1,283 @@
+"""
+Log of every graded answer, and the progress report computed from it.
+
+Each answer is appended to progress/answers.events as one fixed-size
+binary record (RECORD, 41 bytes): when it was given, the item id, the
+field asked, the ratio (NaN when there was none), how long the learner
+took to answer (NaN when unknown) and flags (right, help used, answered
+by choosing). A record is written with a single write; a torn last
+record (the process died in the middle of it) is cut off the next time
+the log is opened for writing, and ignored when it is read.
+
+The report loads the whole log with one np.fromfile (NumPy is imported
+only then) and aggregates it with bincount over integer codes: the
+items and fields are turned into codes once with np.unique, and the
+JLPT level, parts of speech and tags of each distinct item are looked up
+in the corpus once, not once per event. It gives:
+
+- the overall accuracy and latency;
+- a retention curve: the accuracy of an answer given the time since the
+  previous answer to the same question;
+- per JLPT level, part of speech and tag: accuracy, latency, and the
+  weakest (lowest accuracy) and slowest (highest median latency) items.
+
+Usage:
+    python events.py [--top 5] [--json report.json] [--learner NAME]
+"""
+
+import argparse
+import json
+import math
+import struct
+import time
+from pathlib import Path
+
+EVENTS_FILE = "answers.events"
+
+# time, item id, field, ratio, latency (seconds), flags.
+RECORD = struct.Struct("<d16s8sffB")
+RIGHT = 1
+HELP_USED = 2
+CHOICE = 4
+
+# Upper bounds (seconds since the previous answer) of the retention curve buckets.
+RETENTION_BUCKETS = [(60, "1 min"), (600, "10 min"), (3600, "1 hour"), (86400, "1 day"),
+                     (7 * 86400, "1 week"), (30 * 86400, "1 month"), (math.inf, "more")]
+# An item needs this many answers to be listed among the weakest or slowest.
+MIN_ANSWERS = 3
+TOP_ITEMS = 5
+
+
+def record_dtype():
+    import numpy as np
+
+    return np.dtype([("time", "<f8"), ("item", "S16"), ("field", "S8"), ("ratio", "<f4"),
+                     ("latency", "<f4"), ("flags", "u1")])
+
+
+class EventLog:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+
+    def __len__(self) -> int:
+        return self.path.stat().st_size // RECORD.size if self.path.exists() else 0
+
+    def append(self, item_id: str, field_name: str, is_ok: bool, ratio: float | None,
+               latency: float | None = None, help_used: bool = False, choice: bool = False,
+               timestamp: float | None = None) -> None:
+        item = item_id.encode("utf-8")
+        field = field_name.encode("utf-8")
+        if len(item) > 16 or len(field) > 8:
+            raise ValueError(f"Item id or field too long for an event: {item_id} {field_name}")
+        flags = (RIGHT if is_ok else 0) | (HELP_USED if help_used else 0) | (CHOICE if choice else 0)
+        record = RECORD.pack(time.time() if timestamp is None else timestamp, item, field,
+                             math.nan if ratio is None else ratio, math.nan if latency is None else latency, flags)
+        if self._file is None:
+            self._open()
+        self._file.write(record)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def read(self):
+        """Every complete record, as a NumPy structured array (see record_dtype())."""
+        import numpy as np
+
+        if not self.path.exists():
+            return np.zeros(0, dtype=record_dtype())
+        with self.path.open("rb") as f:
+            return np.fromfile(f, dtype=record_dtype(), count=len(self))
+
+    def _open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("ab")
+        size = self._file.tell()
+        if size % RECORD.size:
+            # Crash during an append: drop the torn record.
+            self._file.truncate(size - size % RECORD.size)
+
+
+def _item_groups(item) -> list[tuple[str, str]]:
+    """(grouping, group) of an item of the corpus: JLPT level, parts of speech and tags."""
+    level = item.jlpt()
+    groups = [("jlpt", f"N{level}" if level else "no level")]
+    kinds = [kind for kind in getattr(item, "kinds", ("kanji",)) if kind]
+    groups += [("pos", kind) for kind in kinds or ["not specified"]]
+    groups += [("tag", tag) for tag in getattr(item, "tags", ()) if tag]
+    return groups
+
+
+def report(events, corpus, top: int = TOP_ITEMS) -> dict:
+    """Accuracy, latency, retention curve and per group statistics of the
+    events (EventLog.read()); corpus gives the groups of each item."""
+    import numpy as np
+
+    right = (events["flags"] & RIGHT) != 0
+    latency = events["latency"].astype(np.float64)
+    timed = np.isfinite(latency)
+    result = {"answers": len(events), "accuracy": _mean(right), "median_latency": _median(latency[timed]),
+              "retention": [], "groups": {"jlpt": [], "pos": [], "tag": []}}
+    if not len(events):
+        return result
+
+    # Questions: one code per (item, field).
+    items, item_codes = np.unique(events["item"], return_inverse=True)
+    fields, field_codes = np.unique(events["field"], return_inverse=True)
+    codes = item_codes * len(fields) + field_codes
+    size = len(items) * len(fields)
+    count = np.bincount(codes, minlength=size)
+    right_count = np.bincount(codes, weights=right, minlength=size)
+    timed_count = np.bincount(codes[timed], minlength=size)
+    latency_total = np.bincount(codes[timed], weights=latency[timed], minlength=size)
+    median_latency = _median_by_code(codes[timed], latency[timed], size)
+    accuracy = np.divide(right_count, count, out=np.full(size, np.nan), where=count > 0)
+
+    order = np.lexsort((events["time"], codes))
+    again = codes[order][1:] == codes[order][:-1]
+    gaps = np.diff(events["time"][order])[again]
+    buckets = np.searchsorted([bound for bound, _ in RETENTION_BUCKETS], gaps)
+    bucket_count = np.bincount(buckets, minlength=len(RETENTION_BUCKETS))
+    bucket_right = np.bincount(buckets, weights=right[order][1:][again], minlength=len(RETENTION_BUCKETS))
+    result["retention"] = [{"after": label, "answers": int(answers), "accuracy": _ratio(right_answers, answers)}
+                           for (_, label), answers, right_answers in zip(RETENTION_BUCKETS, bucket_count, bucket_right)]
+
+    # (question code, group code) pairs, from the groups of each distinct item.
+    groups: dict[tuple[str, str], int] = {}
+    pair_codes, pair_groups = [], []
+    for item_code, item_id in enumerate(items.tolist()):
+        item = corpus.item(item_id.decode("utf-8"))
+        for group in _item_groups(item) if item is not None else []:
+            group_code = groups.setdefault(group, len(groups))
+            pair_codes += range(item_code * len(fields), (item_code + 1) * len(fields))
+            pair_groups += [group_code] * len(fields)
+    pair_codes = np.asarray(pair_codes, dtype=np.int64)
+    pair_groups = np.asarray(pair_groups, dtype=np.int64)
+
+    def group_sum(values):
+        return np.bincount(pair_groups, weights=values[pair_codes], minlength=len(groups))
+
+    group_count, group_right = group_sum(count), group_sum(right_count)
+    group_timed, group_latency = group_sum(timed_count), group_sum(latency_total)
+
+    def describe(code: int) -> dict:
+        return {"item": items[code // len(fields)].decode("utf-8"), "field": fields[code % len(fields)].decode("utf-8"),
+                "answers": int(count[code]), "accuracy": float(accuracy[code]),
+                "median_latency": _float(median_latency[code])}
+
+    listed = count >= MIN_ANSWERS
+    for (grouping, name), group_code in sorted(groups.items()):
+        if not group_count[group_code]:
+            continue
+        members = pair_codes[pair_groups == group_code]
+        members = members[listed[members]]
+        weakest = members[np.lexsort((-count[members], accuracy[members]))][:top]
+        members = members[np.isfinite(median_latency[members])]
+        slowest = members[np.argsort(-median_latency[members], kind="stable")][:top]
+        result["groups"][grouping].append({
+            "group": name, "answers": int(group_count[group_code]),
+            "accuracy": _ratio(group_right[group_code], group_count[group_code]),
+            "mean_latency": _ratio(group_latency[group_code], group_timed[group_code]),
+            "weakest": [describe(code) for code in weakest.tolist()],
+            "slowest": [describe(code) for code in slowest.tolist()],
+        })
+    return result
+
+
+def _median_by_code(codes, values, size: int):
+    """Median of the values of each code in range(size), NaN for a code without value."""
+    import numpy as np
+
+    # Sorted by value, then (stable) by code: faster than a lexsort.
+    order = np.argsort(values)
+    order = order[np.argsort(codes[order], kind="stable")]
+    values = values[order]
+    count = np.bincount(codes, minlength=size)
+    start = np.cumsum(count) - count
+    medians = np.full(size, np.nan)
+    has = count > 0
+    low = start[has] + (count[has] - 1) // 2
+    high = start[has] + count[has] // 2
+    medians[has] = (values[low] + values[high]) / 2
+    return medians
+
+
+def _median(values) -> float | None:
+    import numpy as np
+
+    return float(np.median(values)) if len(values) else None
+
+
+def _mean(values) -> float | None:
+    return float(values.mean()) if len(values) else None
+
+
+def _ratio(numerator: float, denominator: float) -> float | None:
+    return float(numerator / denominator) if denominator else None
+
+
+def _float(value: float) -> float | None:
+    return None if math.isnan(value) else float(value)
+
+
+def _percent(value: float | None) -> str:
+    return "-" if value is None else f"{value * 100:.0f}%"
+
+
+def _seconds(value: float | None) -> str:
+    return "-" if value is None else f"{value:.1f}s"
+
+
+def format_report(result: dict, labels: dict[str, str] | None = None) -> str:
+    """The report as text; labels gives the text shown for an item id."""
+    labels = labels or {}
+    lines = [f"{result['answers']} answers, accuracy {_percent(result['accuracy'])}, "
+             f"median time to answer {_seconds(result['median_latency'])}"]
+    if any(bucket["answers"] for bucket in result["retention"]):
+        lines.append("Accuracy by time since the previous answer to the same question:")
+        lines += [f"  < {bucket['after']:<8} {_percent(bucket['accuracy']):>5} ({bucket['answers']} answers)"
+                  for bucket in result["retention"] if bucket["answers"]]
+    titles = {"jlpt": "JLPT level", "pos": "part of speech", "tag": "tag"}
+    for grouping, groups in result["groups"].items():
+        if groups:
+            lines.append(f"By {titles[grouping]}:")
+        for group in groups:
+            lines.append(f"  {group['group']:<16} {_percent(group['accuracy']):>5} ({group['answers']} answers, "
+                         f"mean time {_seconds(group['mean_latency'])})")
+            for title, entries, value in [("weakest", group["weakest"], lambda entry: _percent(entry["accuracy"])),
+                                          ("slowest", group["slowest"], lambda entry: _seconds(entry["median_latency"]))]:
+                if entries:
+                    lines.append(f"    {title}: " + ", ".join(
+                        f"{labels.get(entry['item'], entry['item'])} ({entry['field']} {value(entry)})"
+                        for entry in entries))
+    return "\n".join(lines)
+
+
+def main():
+    from training import Corpus
+
+    parser = argparse.ArgumentParser(description="Report on every answer recorded by training sessions.")
+    parser.add_argument("--top", type=int, default=TOP_ITEMS, help="weakest and slowest items listed per group")
+    parser.add_argument("--json", type=Path, help="also write the report to this JSON file")
+    parser.add_argument("--learner", help="progress profile (default: the progress directory itself)")
+    args = parser.parse_args()
+
+    corpus = Corpus(profile=args.learner)
+    events = corpus.events.read()
+    result = report(events, corpus, args.top)
+    labels = {}
+    for groups in result["groups"].values():
+        for group in groups:
+            for entry in group["weakest"] + group["slowest"]:
+                labels[entry["item"]] = str(corpus.item(entry["item"]))
+    print(format_report(result, labels))
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
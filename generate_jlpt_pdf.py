@@ -7,15 +7,31 @@ interactive setup (vocabulary/top-verbs, test type, part of speech, JLPT
 level) used to start a training session, so the PDF always lists the same
 words a training Session would quiz on (burned words excluded).
 
+Batch mode renders every JLPT level x part of speech x exercise field
+combination in one run, one PDF each, spread across a process pool: the
+Japanese font is registered and the corpus loaded once per worker. Long
+lists are laid out as a sequence of tables of CHUNK_ROWS rows (the header
+repeated on each page) rather than one huge table.
+
 Usage:
     python generate_jlpt_pdf.py
     (then answer the same prompts as when starting a training session)
 
+    python generate_jlpt_pdf.py --batch [--levels 5 4] [--pos verb adj] [--fields 1 2]
+                                [--output-dir pdf] [--jobs N] [--config batch.json]
+    (--config: a JSON object with any of levels, pos, fields, output_dir,
+    jobs and font_path; command line flags take precedence)
+
 Requires: pip install reportlab
 """
 
+import argparse
+import itertools
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
@@ -25,14 +41,20 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
 
-from training import Session, SessionTags, SessionVocabulary, Word
+from training import POS_CHOICES, Corpus, Session, SessionTags, SessionVocabulary, Word
 
 JAPANESE_FONT = "NotoSansJP"
 JAPANESE_FONT_PATH = r"C:\Windows\Fonts\NotoSansJP-VF.ttf"
+JLPT_LEVELS = [5, 4, 3, 2, 1]
+# Rows per table: reportlab lays a table out as a whole, so one table per
+# chunk keeps the layout cost linear in the number of words.
+CHUNK_ROWS = 200
+
+_worker_corpus: Corpus | None = None
 
 
-def register_japanese_font():
-    pdfmetrics.registerFont(TTFont(JAPANESE_FONT, JAPANESE_FONT_PATH))
+def register_japanese_font(font_path: str = JAPANESE_FONT_PATH):
+    pdfmetrics.registerFont(TTFont(JAPANESE_FONT, font_path))
 
 
 def collect_words(session: Session) -> list[Word]:
@@ -43,7 +65,7 @@ def collect_words(session: Session) -> list[Word]:
 
 def describe_session(session: Session) -> str:
     if isinstance(session, SessionVocabulary):
-        word_type = session.part_of_speech or "all"
+        word_type = session.kind or "all"
     elif isinstance(session, SessionTags):
         word_type = session.tag
     else:
@@ -52,19 +74,9 @@ def describe_session(session: Session) -> str:
     return f"{word_type}_JLPT_{jlpt_label}"
 
 
-def main():
-    session = Session.build_session()
-
-    words = collect_words(session)
-
-    if not words:
-        print("No words found for this session (burned words excluded, or a kanji-only test was selected).")
-        return
-
-    register_japanese_font()
-
+def build_table(words: list[Word], japanese_font: str = JAPANESE_FONT) -> Table:
     header_style = ParagraphStyle(name="Header", fontName="Helvetica-Bold", fontSize=10, leading=12)
-    jp_style = ParagraphStyle(name="Japanese", fontName=JAPANESE_FONT, fontSize=11, leading=14)
+    jp_style = ParagraphStyle(name="Japanese", fontName=japanese_font, fontSize=11, leading=14)
     en_style = ParagraphStyle(name="English", fontName="Helvetica", fontSize=9, leading=12)
 
     data = [[
@@ -94,16 +106,113 @@ def main():
         ("TOPPADDING", (0, 0), (-1, -1), 3),
         ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
     ]))
+    return table
 
-    label = describe_session(session)
-    output_path = os.path.abspath(f"{label}.pdf")
 
+def build_story(words: list[Word], japanese_font: str = JAPANESE_FONT, chunk_rows: int = CHUNK_ROWS) -> list[Table]:
+    return [build_table(words[start:start + chunk_rows], japanese_font)
+            for start in range(0, len(words), chunk_rows)]
+
+
+def write_pdf(words: list[Word], output_path: str, label: str) -> None:
     doc = SimpleDocTemplate(
         output_path,
         pagesize=A4,
         title=label,
     )
-    doc.build([table])
+    doc.build(build_story(words))
+
+
+def batch_combinations(levels: list[int], pos_choices: list[str], fields: list[int]) -> list[tuple[int, str, int]]:
+    return list(itertools.product(levels, pos_choices, fields))
+
+
+def _init_worker(root: str, font_path: str, layers: dict[str, dict]) -> None:
+    global _worker_corpus
+    register_japanese_font(font_path)
+    _worker_corpus = Corpus(Path(root), layers=layers)
+
+
+def render_combination(level: int, pos: str, field: int, output_dir: str) -> tuple[str, int]:
+    """Write the PDF of one combination (in a worker): path and number of words, no file when empty."""
+    word_field = Word.fields()[field - 1]
+    session = Session.from_options(_worker_corpus, "v", "w", pos, word_field, [level])
+    words = collect_words(session)
+    label = f"{describe_session(session)}_{word_field[0]}_from_{'_'.join(word_field[1])}"
+    output_path = os.path.abspath(os.path.join(output_dir, f"{label}.pdf"))
+    if words:
+        write_pdf(words, output_path, label)
+    return output_path, len(words)
+
+
+def run_batch(levels: list[int], pos_choices: list[str], fields: list[int], output_dir: str,
+              jobs: int | None = None, font_path: str = JAPANESE_FONT_PATH) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    # Compile the snapshot and load the burns once, before the workers all
+    # try to: the workers get them read only.
+    corpus = Corpus()
+    corpus.word_index
+    for field in Word.fields():
+        corpus.burns(field[0])
+    corpus.burns('meanings')
+    combinations = batch_combinations(levels, pos_choices, fields)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(".", font_path, corpus.loaded_layers())) as executor:
+        futures = [executor.submit(render_combination, level, pos, field, output_dir)
+                   for level, pos, field in combinations]
+        for future in as_completed(futures):
+            output_path, count = future.result()
+            if count:
+                print(f"Generated {output_path} with {count} word(s).")
+            else:
+                print(f"Skipped {output_path}: no words.")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate PDF word lists.")
+    parser.add_argument("--batch", action="store_true", help="render every combination without prompting")
+    parser.add_argument("--config", type=Path, help="JSON file with the batch options")
+    parser.add_argument("--levels", type=int, nargs="+", choices=JLPT_LEVELS)
+    parser.add_argument("--pos", nargs="+", choices=list(POS_CHOICES))
+    parser.add_argument("--fields", type=int, nargs="+", choices=range(1, len(Word.fields()) + 1),
+                        help="exercise numbers, as in the training prompt")
+    parser.add_argument("--output-dir")
+    parser.add_argument("--jobs", type=int)
+    parser.add_argument("--font-path")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config is not None:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        args.batch = True
+    defaults = {"levels": JLPT_LEVELS, "pos": list(POS_CHOICES), "fields": list(range(1, len(Word.fields()) + 1)),
+                "output_dir": ".", "jobs": None, "font_path": JAPANESE_FONT_PATH}
+    for name, default in defaults.items():
+        if getattr(args, name) is None:
+            setattr(args, name, config.get(name, default))
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.batch:
+        run_batch(args.levels, args.pos, args.fields, args.output_dir, args.jobs, args.font_path)
+        return
+
+    session = Session.build_session(Corpus(), listing=True)
+
+    words = collect_words(session)
+
+    if not words:
+        print("No words found for this session (burned words excluded, or a kanji-only test was selected).")
+        return
+
+    register_japanese_font(args.font_path)
+
+    label = describe_session(session)
+    output_path = os.path.abspath(f"{label}.pdf")
+    write_pdf(words, output_path, label)
 
     print(f"Generated {output_path} with {len(words)} word(s).")
 
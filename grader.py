@@ -0,0 +1,148 @@
+"""
+Answer grading, compiled once per question.
+
+A Grader returns exactly what check_field() always returned: the best
+SequenceMatcher ratio of the response against the solutions, or 0.0 when
+it is too close (> 0.85) to a forbidden answer. It just avoids most of the
+work:
+
+- an exact solution or forbidden answer is found with a set lookup;
+- the response is set once as the matcher's second sequence, so its
+  character index is built once instead of once per candidate;
+- a candidate is only fully compared when its cheap upper bounds (length
+  bound, then quick_ratio) can still beat the current best ratio, or the
+  forbid limit;
+- the last few responses are kept in a small LRU cache.
+
+A Grader can also be given the accepted variants of the solutions (any
+object with an accepts(response) method, like spelling.RomajiAutomaton): a
+response it accepts, and that is not forbidden, is right with a ratio of
+1.0 without any comparison.
+
+grade_batch() grades many cases at once without compiling a Grader for
+each: a case repeated in the batch is graded once, an exact solution far
+(on lengths) from every forbidden answer is screened out with lookups
+alone, and the comparisons left share one matcher per distinct response.
+"""
+
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Sequence
+
+FORBID_LIMIT = 0.85
+MEANING_LIMIT = 0.6
+EXACT_LIMIT = 1.0
+
+
+def _length_bound(a: str, b: str) -> float:
+    """SequenceMatcher.real_quick_ratio() without building a matcher."""
+    total = len(a) + len(b)
+    return 2.0 * min(len(a), len(b)) / total if total else 1.0
+
+
+class Grader:
+    def __init__(self, solutions: list[str], forbids: list[str], should_be_exact: bool, cache_size: int = 32,
+                 variants=None):
+        self.solutions = tuple(dict.fromkeys(solutions))
+        self.variants = variants
+        self.forbids = tuple(dict.fromkeys(forbids))
+        self.limit = EXACT_LIMIT if should_be_exact else MEANING_LIMIT
+        self._solution_set = frozenset(self.solutions)
+        self._forbid_set = frozenset(self.forbids)
+        self._solution_texts = frozenset(solution.strip() for solution in self.solutions)
+        self._cache: OrderedDict[str, tuple[bool, float]] = OrderedDict()
+        self._cache_size = cache_size
+
+    def grade(self, response: str) -> tuple[bool, float]:
+        result = self._cache.get(response)
+        if result is not None:
+            self._cache.move_to_end(response)
+            return result
+        result = self._grade(response)
+        self._cache[response] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def is_solution(self, text: str) -> bool:
+        """text is one of the solutions (spaces around aside) or an accepted
+        variant; no ratio is computed."""
+        text = text.strip()
+        return text in self._solution_texts or (self.variants is not None and self.variants.accepts(text))
+
+    def _grade(self, response: str) -> tuple[bool, float]:
+        matcher = SequenceMatcher(None, "", response)
+        if self._is_forbidden(matcher, response):
+            return False, 0.0
+        if self.variants is not None and self.variants.accepts(response):
+            return True, 1.0
+        ratio = self._best_ratio(matcher, response)
+        return ratio >= self.limit, ratio
+
+    def _is_forbidden(self, matcher: SequenceMatcher, response: str) -> bool:
+        return _is_forbidden(matcher, response, self.forbids, self._forbid_set)
+
+    def _best_ratio(self, matcher: SequenceMatcher, response: str) -> float:
+        return _best_ratio(matcher, response, self.solutions, self._solution_set)
+
+
+def _is_forbidden(matcher: SequenceMatcher, response: str, forbids: Sequence[str], forbid_set) -> bool:
+    """response (the matcher's second sequence) is too close to a forbidden answer."""
+    if response in forbid_set:
+        return True
+    for forbid in forbids:
+        if _length_bound(forbid, response) <= FORBID_LIMIT:
+            continue
+        matcher.set_seq1(forbid)
+        if matcher.quick_ratio() > FORBID_LIMIT and matcher.ratio() > FORBID_LIMIT:
+            return True
+    return False
+
+
+def _best_ratio(matcher: SequenceMatcher, response: str, solutions: Sequence[str], solution_set) -> float:
+    """Best ratio of response (the matcher's second sequence) against the solutions."""
+    if response in solution_set:
+        return 1.0
+    best = 0.0
+    candidates = sorted(((_length_bound(solution, response), solution) for solution in solutions), reverse=True)
+    for bound, solution in candidates:
+        if bound <= best:
+            break
+        matcher.set_seq1(solution)
+        if matcher.quick_ratio() <= best:
+            continue
+        ratio = matcher.ratio()
+        if ratio > best:
+            best = ratio
+    return best
+
+
+def grade_batch(cases: Sequence[tuple[str, Sequence[str], Sequence[str], bool]]) -> list[tuple[bool, float]]:
+    """Grader(solutions, forbids, should_be_exact).grade(response) of every
+    (response, solutions, forbids, should_be_exact) case, without compiling
+    a Grader: a case repeated in the batch is graded once, a response that
+    is a solution and not close to a forbidden answer (on lengths) needs no
+    matcher, and the cases with the same response share one matcher."""
+    graded: dict[tuple, tuple[bool, float]] = {}
+    matchers: dict[str, SequenceMatcher] = {}
+    results = []
+    for response, solutions, forbids, should_be_exact in cases:
+        key = (response, tuple(solutions), tuple(forbids), should_be_exact)
+        result = graded.get(key)
+        if result is None:
+            if response in forbids:
+                result = (False, 0.0)
+            elif response in solutions and all(_length_bound(forbid, response) <= FORBID_LIMIT for forbid in forbids):
+                result = (True, 1.0)
+            else:
+                matcher = matchers.get(response)
+                if matcher is None:
+                    matcher = matchers[response] = SequenceMatcher(None, "", response)
+                if _is_forbidden(matcher, response, forbids, ()):
+                    result = (False, 0.0)
+                else:
+                    ratio = _best_ratio(matcher, response, solutions, solutions)
+                    result = (ratio >= (EXACT_LIMIT if should_be_exact else MEANING_LIMIT), ratio)
+            graded[key] = result
+        results.append(result)
+    return results
@@ -0,0 +1,147 @@
+"""
+Where the quiz spends its time.
+
+Once a Trace is activated, the code wrapped in phase("name") is timed:
+startup phases (loading the corpus and the progress journals, building
+the questions) and, for each turn (one question, from the moment it is
+shown), grading, saving progress, commands, rendering and the time spent
+waiting for the learner. When no Trace is active, phase() returns a
+shared no-op context manager, so instrumented code costs one global
+lookup. A phase opened inside another one is keyed by its path
+("build_questions/load_words"), so it is counted within its parent rather
+than next to it: the top level phases add up to the time traced.
+
+A Trace can also run cProfile or tracemalloc for the whole session. It
+prints a summary (per-phase count, total, median, p90, max) and exports
+everything as JSON.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+PROFILERS = ["cprofile", "tracemalloc"]
+PROFILE_LINES = 20
+
+_NO_PHASE = nullcontext()
+
+
+class Trace:
+    def __init__(self, profile: str | None = None):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"profile must be one of {', '.join(PROFILERS)}")
+        self.profile = profile
+        self.startup: dict[str, float] = {}
+        self.turns: list[dict] = []
+        self.profile_report: dict | None = None
+        self._turn: dict | None = None
+        self._profiler: cProfile.Profile | None = None
+        self._open: list[str] = []
+
+    def start(self) -> None:
+        if self.profile == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == "tracemalloc":
+            tracemalloc.start()
+
+    def stop(self) -> None:
+        if self._profiler is not None:
+            self._profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            self.profile_report = {"cprofile": output.getvalue()}
+            self._profiler = None
+        elif self.profile == "tracemalloc" and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_LINES]
+            tracemalloc.stop()
+            self.profile_report = {"tracemalloc": {"current": current, "peak": peak,
+                                                   "top": [str(statistic) for statistic in top]}}
+
+    @contextmanager
+    def phase(self, name: str):
+        path = "/".join(self._open + [name])
+        self._open.append(name)
+        # Listed before the phases it contains.
+        (self._turn["phases"] if self._turn is not None else self.startup).setdefault(path, 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._open.pop()
+            phases = self._turn["phases"] if self._turn is not None else self.startup
+            phases[path] = phases.get(path, 0.0) + time.perf_counter() - start
+
+    def begin_turn(self, number: int) -> None:
+        self._turn = {"number": number, "phases": {}}
+        self.turns.append(self._turn)
+
+    def phase_stats(self) -> dict[str, dict[str, float]]:
+        """Count, total, median, p90 and max per turn phase."""
+        by_phase: dict[str, list[float]] = {}
+        for turn in self.turns:
+            for name, seconds in turn["phases"].items():
+                by_phase.setdefault(name, []).append(seconds)
+        stats = {}
+        for name, values in by_phase.items():
+            values.sort()
+            stats[name] = {"count": len(values), "total": sum(values), "median": values[len(values) // 2],
+                           "p90": values[min(len(values) - 1, int(len(values) * 0.9))], "max": values[-1]}
+        return stats
+
+    def summary(self) -> str:
+        width = max([16] + [len(name) for name in self.startup] + [len(name) for turn in self.turns
+                                                                  for name in turn["phases"]])
+        lines = ["Startup:"]
+        lines += [f"  {name:<{width}} {seconds * 1e3:10.2f} ms" for name, seconds in self.startup.items()]
+        lines.append(f"Turns ({len(self.turns)}), per turn:")
+        for name, stats in self.phase_stats().items():
+            lines.append(f"  {name:<{width}} total {stats['total'] * 1e3:10.2f} ms  median {stats['median'] * 1e3:8.3f} ms"
+                         f"  p90 {stats['p90'] * 1e3:8.3f} ms  max {stats['max'] * 1e3:8.3f} ms")
+        if self.profile_report is not None and "cprofile" in self.profile_report:
+            lines.append(self.profile_report["cprofile"])
+        elif self.profile_report is not None:
+            report = self.profile_report["tracemalloc"]
+            lines.append(f"Memory: {report['current'] / 1e6:.1f} MB, peak {report['peak'] / 1e6:.1f} MB")
+            lines += ["  " + line for line in report["top"]]
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        return {"startup": self.startup, "turns": self.turns, "phases": self.phase_stats(),
+                "profile": self.profile_report}
+
+    def export(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+_active: Trace | None = None
+
+
+def activate(trace: Trace) -> None:
+    global _active
+    _active = trace
+    trace.start()
+
+
+def deactivate() -> Trace | None:
+    global _active
+    trace, _active = _active, None
+    if trace is not None:
+        trace.stop()
+    return trace
+
+
+def phase(name: str):
+    return _NO_PHASE if _active is None else _active.phase(name)
+
+
+def begin_turn(number: int) -> None:
+    if _active is not None:
+        _active.begin_turn(number)
@@ -0,0 +1,99 @@
+"""
+Japanese script tables, built once at import and shared by the corpus
+build (snapshot.py) and the trainer.
+"""
+
+KATAKANA = frozenset("ァアィイゥウェエォオカガキギクグケゲコゴサザシジスズセゼソゾタダチヂッツヅテデトドナニヌネノハバパヒビピフブプヘベペホボポマミムメモャヤュユョヨラリルレロヮワヰヱヲンヴヵヶー・ヽヾ")
+
+
+def has_katakana(text: str) -> bool:
+    return not KATAKANA.isdisjoint(text)
+
+
+def to_hiragana(text: str) -> str:
+    """text with its katakana (but the long vowel mark ー) turned into hiragana."""
+    return "".join(chr(ord(char) - 0x60) if "ァ" <= char <= "ヶ" else char for char in text)
+
+
+VOWELS = "aiueo"
+
+# Romaji of each hiragana: Hepburn first, then Kunrei / Nihon-shiki.
+ROMAJI = {
+    "あ": ["a"], "い": ["i"], "う": ["u"], "え": ["e"], "お": ["o"],
+    "か": ["ka"], "き": ["ki"], "く": ["ku"], "け": ["ke"], "こ": ["ko"],
+    "が": ["ga"], "ぎ": ["gi"], "ぐ": ["gu"], "げ": ["ge"], "ご": ["go"],
+    "さ": ["sa"], "し": ["shi", "si"], "す": ["su"], "せ": ["se"], "そ": ["so"],
+    "ざ": ["za"], "じ": ["ji", "zi"], "ず": ["zu"], "ぜ": ["ze"], "ぞ": ["zo"],
+    "た": ["ta"], "ち": ["chi", "ti"], "つ": ["tsu", "tu"], "て": ["te"], "と": ["to"],
+    "だ": ["da"], "ぢ": ["ji", "di", "zi"], "づ": ["zu", "du", "dzu"], "で": ["de"], "ど": ["do"],
+    "な": ["na"], "に": ["ni"], "ぬ": ["nu"], "ね": ["ne"], "の": ["no"],
+    "は": ["ha"], "ひ": ["hi"], "ふ": ["fu", "hu"], "へ": ["he"], "ほ": ["ho"],
+    "ば": ["ba"], "び": ["bi"], "ぶ": ["bu"], "べ": ["be"], "ぼ": ["bo"],
+    "ぱ": ["pa"], "ぴ": ["pi"], "ぷ": ["pu"], "ぺ": ["pe"], "ぽ": ["po"],
+    "ま": ["ma"], "み": ["mi"], "む": ["mu"], "め": ["me"], "も": ["mo"],
+    "や": ["ya"], "ゆ": ["yu"], "よ": ["yo"],
+    "ら": ["ra"], "り": ["ri"], "る": ["ru"], "れ": ["re"], "ろ": ["ro"],
+    "わ": ["wa"], "ゐ": ["i", "wi"], "ゑ": ["e", "we"], "を": ["o", "wo"], "ゔ": ["vu"],
+    "ぁ": ["a", "xa", "la"], "ぃ": ["i", "xi", "li"], "ぅ": ["u", "xu", "lu"], "ぇ": ["e", "xe", "le"],
+    "ぉ": ["o", "xo", "lo"], "ゃ": ["ya", "xya", "lya"], "ゅ": ["yu", "xyu", "lyu"], "ょ": ["yo", "xyo", "lyo"],
+    "ゎ": ["wa", "xwa", "lwa"],
+}
+
+# Kana + small ya/yu/yo, by the romaji of the kana without its vowel.
+_DIGRAPH_STEMS = {
+    "き": ["ky"], "ぎ": ["gy"], "し": ["sh", "sy"], "じ": ["j", "zy", "jy"], "ち": ["ch", "ty", "cy"],
+    "ぢ": ["j", "dy", "zy"], "に": ["ny"], "ひ": ["hy"], "び": ["by"], "ぴ": ["py"], "み": ["my"], "り": ["ry"],
+}
+DIGRAPHS = {stem + small: [consonant + vowel for consonant in consonants]
+            for stem, consonants in _DIGRAPH_STEMS.items()
+            for small, vowel in [("ゃ", "a"), ("ゅ", "u"), ("ょ", "o")]}
+
+# A syllable ending with the vowel, followed by the kana, may be spelled with
+# the vowel replaced by one of these (on top of the two spelled one after the other).
+LONG_VOWELS = {
+    ("a", "あ"): ["ā", "â"], ("i", "い"): ["ī", "î"], ("u", "う"): ["ū", "û"], ("e", "え"): ["ē", "ê"],
+    ("o", "う"): ["ō", "ô", "oh", "oo"], ("o", "お"): ["ō", "ô", "oh"],
+    ("a", "ー"): ["ā", "â", "aa"], ("i", "ー"): ["ī", "î", "ii"], ("u", "ー"): ["ū", "û", "uu"],
+    ("e", "ー"): ["ē", "ê", "ee"], ("o", "ー"): ["ō", "ô", "oo", "ou"],
+}
+
+# Hepburn romaji of every kana and digraph, for kana_to_romaji().
+HEPBURN = {kana: spellings[0] for kana, spellings in {**ROMAJI, **DIGRAPHS}.items()}
+
+
+def has_kana(text: str) -> bool:
+    return any("ぁ" <= char <= "ゖ" or char in KATAKANA for char in text)
+
+
+def kana_to_romaji(text: str) -> str:
+    """Hepburn romaji of the kana of text, katakana included, in one pass;
+    other characters are kept as they are."""
+    text = to_hiragana(text)
+    romaji: list[str] = []
+    double_next = False
+    position = 0
+    while position < len(text):
+        char = text[position]
+        following = text[position + 1] if position + 1 < len(text) else ""
+        position += 1
+        if char + following in HEPBURN:
+            spelling = HEPBURN[char + following]
+            position += 1
+        elif char in HEPBURN:
+            spelling = HEPBURN[char]
+        elif char == "っ":
+            double_next = True
+            continue
+        elif char == "ん":
+            spelling = "n'" if HEPBURN.get(following, "n")[0] in VOWELS + "y" else "n"
+        elif char == "ー" and romaji and romaji[-1][-1:] in VOWELS:
+            spelling = romaji[-1][-1]
+        elif char in "～〜":
+            spelling = "~"
+        else:
+            spelling = char
+        if double_next and spelling[:1].isalpha() and spelling[0] not in VOWELS:
+            spelling = ("t" if spelling.startswith("ch") else spelling[0]) + spelling
+        double_next = False
+        romaji.append(spelling)
+    return "".join(romaji)
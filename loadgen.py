@@ -0,0 +1,301 @@
+"""
+Drive training sessions without a keyboard, to find the throughput ceiling
+of grading and persistence.
+
+Every session is fed a stream of inputs (answers and -a/-f/-b/-u commands),
+exactly what Session.ask() would read from the terminal:
+
+- synthetic streams (default): for each question, maybe a command, maybe
+  an empty line (help), then a correct answer, a near miss or a wrong
+  answer, with the given rates, until --answers answers were given;
+- recorded streams (--replay): files written by training.py --record,
+  replayed with their options and seed, so the questions come in the
+  recorded order.
+
+Sessions run in-process, interleaved one input at a time over one shared
+Corpus as server.py does, in a scratch copy of the corpus so the progress
+of the working copy is never touched. With --url they are sent to a
+running server.py instead, all at once, one connection per session, each
+with a throwaway progress profile of its own (loadgen-<pid>-<n>, under
+progress/profiles), so the learner's own progress is never touched.
+
+Reported: inputs and answers per second, latency percentiles of answers,
+help requests and commands.
+
+Usage:
+    python loadgen.py [--sessions 100] [--answers 50] [--mode v --jlpt 5 ...] [--seed 0]
+    python loadgen.py --replay session.jsonl [--sessions 100]
+    python loadgen.py --url http://127.0.0.1:8080 [--sessions 100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit
+
+import snapshot
+from training import Corpus, Kanji, Session, Word, add_session_arguments, create_session, session_options
+
+ERROR_RATE = 0.3
+HELP_RATE = 0.1
+COMMAND_RATE = 0.05
+PERCENTILES = [50, 90, 99]
+
+
+class Learner:
+    """Synthetic inputs for one question turn."""
+
+    def __init__(self, rng: random.Random, error_rate: float = ERROR_RATE, help_rate: float = HELP_RATE,
+                 command_rate: float = COMMAND_RATE):
+        self.rng = rng
+        self.error_rate = error_rate
+        self.help_rate = help_rate
+        self.command_rate = command_rate
+
+    def turn(self, item: Kanji | Word, field_name: str) -> list[str]:
+        inputs = []
+        if self.rng.random() < self.command_rate:
+            inputs.append(self.rng.choice(["-a also this", "-f not that", "-b", "-u"]))
+        if self.rng.random() < self.help_rate:
+            inputs.append("")
+        expected = getattr(item, field_name)
+        solution = re.sub(r'\s*\(.*?\)\s*', '', expected).split(";")[0].strip() or expected
+        draw = self.rng.random()
+        if draw < self.error_rate / 2:
+            inputs.append("something else entirely")
+        elif draw < self.error_rate:
+            # Near miss: two letters swapped.
+            inputs.append(solution[1::-1] + solution[2:] if len(solution) > 2 else solution + "x")
+        else:
+            inputs.append(solution)
+        return inputs
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {"answer": [], "help": [], "command": []}
+        self.sessions = 0
+        self.elapsed = 0.0
+
+    def add(self, kind: str, seconds: float) -> None:
+        self.latencies[kind].append(seconds)
+
+    def summary(self) -> dict:
+        inputs = sum(len(latencies) for latencies in self.latencies.values())
+        answers = len(self.latencies["answer"])
+        summary = {
+            "sessions": self.sessions,
+            "inputs": inputs,
+            "answers": answers,
+            "seconds": self.elapsed,
+            "inputs_per_second": inputs / self.elapsed if self.elapsed else None,
+            "answers_per_second": answers / self.elapsed if self.elapsed else None,
+            "latency": {},
+        }
+        for kind, latencies in self.latencies.items():
+            if latencies:
+                latencies = sorted(latencies)
+                summary["latency"][kind] = {f"p{p}": _percentile(latencies, p) for p in PERCENTILES}
+                summary["latency"][kind]["max"] = latencies[-1]
+        return summary
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def print_summary(summary: dict) -> None:
+    print(f"{summary['sessions']} session(s), {summary['inputs']} input(s), {summary['answers']} answer(s) "
+          f"in {summary['seconds']:.2f} s")
+    if summary["seconds"]:
+        print(f"{summary['inputs_per_second']:.0f} inputs/s, {summary['answers_per_second']:.0f} answers/s")
+    for kind, latency in summary["latency"].items():
+        values = "  ".join(f"{name} {seconds * 1e3:.3f} ms" for name, seconds in latency.items())
+        print(f"  {kind:<8} {values}")
+
+
+def load_recording(path: Path) -> tuple[dict, list[str]]:
+    """Options and inputs of a file written by training.py --record."""
+    options, inputs = None, []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "options" in record:
+                if options is not None:
+                    break  # Only the first session of a file is replayed.
+                options = record["options"]
+            else:
+                inputs.append(record["input"])
+    if options is None:
+        raise ValueError(f"{path} holds no recorded session")
+    return options, inputs
+
+
+def synthetic_stream(session: Session, learner: Learner, answers: int) -> Iterator[str]:
+    """Inputs of a learner answering up to answers questions of session."""
+    given = 0
+    while given < answers and (question := session.next_question()) is not None:
+        yield from learner.turn(question.item, question.field[0])
+        given += 1
+
+
+def scratch_corpus(target: Path, source: Path = Path(".")) -> None:
+    """Copy the corpus (not the progress) so the load does not write into the working copy."""
+    for name in [file for file, _ in snapshot.SECTIONS.values()] + [snapshot.SNAPSHOT_FILE]:
+        if (source / name).exists():
+            shutil.copy2(source / name, target / name)
+
+
+def run_in_process(corpus: Corpus, streams: list[tuple[Session, Iterator[str]]]) -> Stats:
+    stats = Stats()
+    stats.sessions = len(streams)
+    active = deque(streams)
+    started = time.perf_counter()
+    while active:
+        session, stream = active.popleft()
+        text = next(stream, None)
+        if text is None or session.next_question() is None:
+            continue
+        start = time.perf_counter()
+        message = session.command(text)
+        if message is not None:
+            stats.add("command", time.perf_counter() - start)
+        else:
+            answer = session.submit(text)
+            session.next_question()
+            stats.add("answer" if answer.graded else "help", time.perf_counter() - start)
+        if not session.stopped:
+            active.append((session, stream))
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, method: str,
+                   path: str, payload: dict | None = None) -> dict:
+    body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    data = json.loads(await reader.readexactly(length)) if length else {}
+    if status not in (200, 201, 400):
+        raise RuntimeError(f"{method} {path}: {status} {data}")
+    return data
+
+
+async def _http_session(url: str, corpus: Corpus, options: dict, inputs: list[str] | None, learner: Learner,
+                        answers: int, stats: Stats) -> None:
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        created = await _request(reader, writer, parts.netloc, "POST", "/sessions", options)
+        path = f"/sessions/{created['session']}"
+        question = created["question"]
+        recorded = iter(inputs) if inputs is not None else None
+        pending: deque[str] = deque()
+        given = 0
+        while question is not None:
+            if recorded is not None:
+                text = next(recorded, None)
+                if text is None:
+                    break
+            else:
+                if not pending:
+                    if given >= answers:
+                        break
+                    pending.extend(learner.turn(corpus.item(question["id"]), question["field"]))
+                    given += 1
+                text = pending.popleft()
+            start = time.perf_counter()
+            data = {"error": None}
+            if text.lstrip().startswith("-"):
+                data = await _request(reader, writer, parts.netloc, "POST", path + "/command", {"command": text})
+            if "error" in data:
+                data = await _request(reader, writer, parts.netloc, "POST", path + "/answer", {"response": text})
+                if "error" in data:
+                    break
+                stats.add("answer" if data["answer"]["graded"] else "help", time.perf_counter() - start)
+            else:
+                stats.add("command", time.perf_counter() - start)
+            question = data.get("question")
+        await _request(reader, writer, parts.netloc, "DELETE", path)
+    finally:
+        writer.close()
+
+
+async def run_http(url: str, corpus: Corpus, sessions: list[tuple[dict, list[str] | None, Learner]],
+                   answers: int) -> Stats:
+    stats = Stats()
+    stats.sessions = len(sessions)
+    started = time.perf_counter()
+    # Commands (-a, -f, -b, -u) write progress: each session gets a throwaway profile.
+    await asyncio.gather(*(_http_session(url, corpus, {**options, "profile": f"loadgen-{os.getpid()}-{number}"},
+                                         inputs, learner, answers, stats)
+                           for number, (options, inputs, learner) in enumerate(sessions)))
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed answer streams through many training sessions.")
+    add_session_arguments(parser)
+    parser.set_defaults(mode="v")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--answers", type=int, default=50, help="answers per synthetic session")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    parser.add_argument("--help-rate", type=float, default=HELP_RATE)
+    parser.add_argument("--command-rate", type=float, default=COMMAND_RATE)
+    parser.add_argument("--replay", type=Path, nargs="+", help="files written by training.py --record")
+    parser.add_argument("--url", help="drive a running server.py instead of in-process sessions")
+    parser.add_argument("--output", type=Path, help="write the summary as JSON")
+    args = parser.parse_args()
+
+    base_seed = 0 if args.seed is None else args.seed
+    recordings = [load_recording(path) for path in args.replay] if args.replay else None
+    sessions = []
+    for number in range(args.sessions):
+        learner = Learner(random.Random(base_seed + number), args.error_rate, args.help_rate, args.command_rate)
+        if recordings is not None:
+            options, inputs = recordings[number % len(recordings)]
+        else:
+            options, inputs = dict(session_options(args), seed=base_seed + number), None
+        sessions.append((options, inputs, learner))
+
+    with tempfile.TemporaryDirectory(prefix="jlpt-loadgen-") as tmp:
+        if args.url is not None:
+            # Only used to look up the expected answers.
+            stats = asyncio.run(run_http(args.url, Corpus(), sessions, args.answers))
+        else:
+            scratch_corpus(Path(tmp))
+            corpus = Corpus(Path(tmp))
+            streams = []
+            for options, inputs, learner in sessions:
+                session = create_session(corpus, options)
+                stream = iter(inputs) if inputs is not None else synthetic_stream(session, learner, args.answers)
+                streams.append((session, stream))
+            stats = run_in_process(corpus, streams)
+
+    summary = stats.summary()
+    print_summary(summary)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Append-only journals holding the learner's progress (burns, overlay
+meanings, answer counters).
+
+Each progress layer is a key -> value map stored as <name>.journal: every
+change is one JSON line appended at the end of the file, so saving an
+answer costs the same whatever the number of tracked words. Opening a
+journal replays it into memory. A torn last line (the process died in the
+middle of a write) is ignored, and cut off by the next write; the rest of
+the journal is kept.
+
+Once the journal holds several times more records than live entries it is
+compacted: rewritten as one record per entry into a temporary file of its
+own, synced, then swapped in with os.replace, so a crash leaves either the
+old or the new journal on disk, never a mix.
+
+The first time a layer is opened, the legacy line-per-index file
+(burn_meaning.txt, word_result_meaning.txt, ...) is imported when present.
+
+Several processes may use the same journal (the server, a terminal,
+loadgen). Opening a journal only reads it. Every write holds an advisory
+lock on <name>.journal.lock: the journal first replays what the other
+processes wrote since it last read the file (all of it when another one
+compacted it), then appends, or compacts. The legacy import and rekey()
+are written by the first write of the process, under the same lock.
+update() computes the new value from the latest one, so two processes
+counting answers never lose one.
+"""
+
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+COMPACT_MIN_RECORDS = 1000
+COMPACT_RATIO = 4
+
+_SET = "s"
+_DELETE = "d"
+
+
+class Journal:
+    def __init__(self, path: Path, legacy: Path | None = None,
+                 parse_legacy: Callable[[str], Any] = str, entries: dict | None = None):
+        """entries: the entries of path, already loaded by another process;
+        the journal then never reads path and is read only."""
+        self.path = Path(path)
+        self.entries: dict = {} if entries is None else dict(entries)
+        self.read_only = entries is not None
+        self._records = 0
+        self._file = None
+        # The file replayed ((device, inode), None before), its compaction
+        # generation (an inode may be reused) and how many of its bytes.
+        self._identity: tuple[int, int] | None = None
+        self._generation = 0
+        self._offset = 0
+        self._lock = None
+        # The file ends with a torn line.
+        self._torn = False
+        # Not written yet: the entries imported from the legacy file, or rekeyed.
+        self._imported = False
+        self._rekeyed = False
+        if self.read_only:
+            return
+        if self.path.exists():
+            self._catch_up(self._read_generation())
+        elif legacy is not None and legacy.exists():
+            self._import_legacy(legacy, parse_legacy)
+            self._imported = True
+
+    def get(self, key, default=None):
+        return self.entries.get(key, default)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def items(self):
+        return self.entries.items()
+
+    def set(self, key, value) -> None:
+        with self._locked():
+            self._write([_SET, key, value])
+
+    def update(self, key, function: Callable[[Any], Any], default=None):
+        """Set key to function(its value, default when absent) and return
+        it; the value is the latest one, whichever process wrote it."""
+        with self._locked():
+            value = function(self.entries.get(key, default))
+            self._write([_SET, key, value])
+        return value
+
+    def delete(self, key) -> None:
+        with self._locked():
+            if key in self.entries:
+                self._write([_DELETE, key])
+
+    def rekey(self, new_key: Callable[[Any], Any]) -> None:
+        """Replace every key by new_key(key), dropping entries mapped to None;
+        the journal is rewritten by the next write."""
+        self._check_writable()
+        entries = {}
+        for key, value in self.entries.items():
+            key = new_key(key)
+            if key is not None:
+                entries[key] = value
+        self.entries = entries
+        self._rekeyed = True
+
+    def compact(self) -> None:
+        with self._locked():
+            self._compact()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _should_compact(self) -> bool:
+        return self._records >= COMPACT_MIN_RECORDS and self._records > COMPACT_RATIO * len(self.entries)
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise PermissionError(f"Read-only journal: {self.path}")
+
+    @contextmanager
+    def _locked(self):
+        """Hold the lock of the journal, the entries up to date with the file."""
+        self._check_writable()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock_path().open("a+b") as lock:
+            _lock(lock)
+            self._lock = lock
+            try:
+                self._catch_up(self._read_generation())
+                yield
+            finally:
+                self._lock = None
+                _unlock(lock)
+
+    def _lock_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".lock")
+
+    def _read_generation(self) -> int:
+        """Number of compactions of the file, kept in the lock file."""
+        if self._lock is not None:
+            self._lock.seek(0)
+            text = self._lock.read()
+        else:
+            try:
+                text = self._lock_path().read_bytes()
+            except FileNotFoundError:
+                return 0
+        return int(text or 0)
+
+    def _write(self, record: list) -> None:
+        self._apply(record)
+        if self._imported or self._rekeyed or self._torn:
+            # The entries already hold the change.
+            self._compact()
+            return
+        if self._file is None:
+            self._file = self.path.open("ab")
+            if self._identity is None:
+                self._identity = _identity(self._file)
+        data = _encode(record).encode("utf-8")
+        self._file.write(data)
+        self._file.flush()
+        self._offset += len(data)
+        self._records += 1
+        if self._should_compact():
+            self._compact()
+
+    def _compact(self) -> None:
+        self.close()
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for key, value in self.entries.items():
+                    f.write(_encode([_SET, key, value]).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+                identity, offset = _identity(f), f.tell()
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._generation += 1
+        self._lock.seek(0)
+        self._lock.truncate()
+        self._lock.write(str(self._generation).encode("ascii"))
+        self._lock.flush()
+        self._identity, self._offset = identity, offset
+        self._records = len(self.entries)
+        self._torn = self._imported = False
+        self._rekeyed = False
+
+    def _catch_up(self, generation: int) -> None:
+        """Replay what the file holds beyond what was read of it: its new
+        lines, or all of it when another process replaced it."""
+        try:
+            f = self.path.open("rb")
+        except FileNotFoundError:
+            return
+        with f:
+            identity = _identity(f)
+            replaced = identity != self._identity or generation != self._generation
+            if replaced:
+                self.close()
+                self.entries = {}
+                self._records = self._offset = 0
+                self._identity, self._generation = identity, generation
+                # Rewritten by another process since: its import and rekey replace ours.
+                self._imported = False
+                self._rekeyed = False
+            f.seek(self._offset)
+            data = f.read()
+        read = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            self._apply(record)
+            self._records += 1
+            read += len(line)
+        self._offset += read
+        # Crash during an append: the torn tail is dropped by the next write.
+        self._torn = read != len(data)
+
+    def _apply(self, record: list) -> None:
+        if record[0] == _SET:
+            self.entries[record[1]] = record[2]
+        else:
+            self.entries.pop(record[1], None)
+
+    def _import_legacy(self, legacy: Path, parse_legacy: Callable[[str], Any]) -> None:
+        with legacy.open("r", encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                value = parse_legacy(line)
+                if value is not None:
+                    self.entries[index] = value
+
+
+def _encode(record: list) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _identity(f) -> tuple[int, int]:
+    status = os.fstat(f.fileno())
+    return status.st_dev, status.st_ino
+
+
+def _lock(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
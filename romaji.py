@@ -0,0 +1,110 @@
+"""
+Romaji of readings, with cutlet.
+
+cutlet is slow (it runs MeCab on every reading), so:
+- identical readings are converted once;
+- conversions are kept in .romaji_cache.json (reading -> romaji), so a
+  later build only converts the readings it has never seen;
+- new readings are split across a process pool, one Cutlet per worker.
+
+cutlet is only imported when a reading actually has to be converted.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+CACHE_FILE = ".romaji_cache.json"
+
+# Below this many new readings, starting the workers costs more than it saves.
+PARALLEL_MIN_READINGS = 200
+CHUNK_SIZE = 100
+
+_katsu = None
+
+
+def _init_worker():
+    global _katsu
+    import cutlet
+    _katsu = cutlet.Cutlet()
+
+
+def _romaji_chunk(readings: list[str]) -> list[str]:
+    return [_katsu.romaji(reading).lower().replace(" ", "").replace(",", ";") for reading in readings]
+
+
+def _cache_version() -> str:
+    # A new cutlet (or dictionary) may romanize differently: start over then.
+    try:
+        return version("cutlet")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def load_cache(path: Path) -> dict[str, str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != _cache_version():
+        return {}
+    return cache["romaji"]
+
+
+def save_cache(path: Path, romaji: dict[str, str]) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": _cache_version(), "romaji": romaji}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def convert(readings: list[str], executor: ProcessPoolExecutor | None = None) -> dict[str, str]:
+    """Romaji of every reading, computed by executor's workers when given."""
+    if executor is None:
+        if _katsu is None:
+            _init_worker()
+        return dict(zip(readings, _romaji_chunk(readings)))
+    chunks = [readings[start:start + CHUNK_SIZE] for start in range(0, len(readings), CHUNK_SIZE)]
+    romaji = {}
+    for chunk, converted in zip(chunks, executor.map(_romaji_chunk, chunks)):
+        romaji.update(zip(chunk, converted))
+    return romaji
+
+
+class RomajiCache:
+    """Romaji of readings, converted on demand and saved by close().
+
+    The process pool is started the first time a batch is large enough,
+    then kept for the following batches."""
+
+    def __init__(self, path: Path = Path(CACHE_FILE), jobs: int | None = None):
+        self.path = Path(path)
+        self.jobs = jobs
+        self.romaji = load_cache(self.path)
+        self.converted = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    def __contains__(self, reading: str) -> bool:
+        return reading in self.romaji
+
+    def __getitem__(self, reading: str) -> str:
+        return self.romaji[reading]
+
+    def convert(self, readings: list[str]) -> None:
+        missing = list(dict.fromkeys(reading for reading in readings if reading not in self.romaji))
+        if not missing:
+            return
+        if self._executor is None and len(missing) >= PARALLEL_MIN_READINGS and self.jobs != 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker)
+        self.romaji.update(convert(missing, self._executor))
+        self.converted += len(missing)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self.converted:
+            save_cache(self.path, self.romaji)
@@ -0,0 +1,91 @@
+"""
+Weighted random draws of questions.
+
+A FenwickTree keeps the running sums of the item weights: drawing an item
+with probability proportional to its weight and changing one weight are
+both O(log n), so the weights can follow every answer without rescanning
+the whole corpus.
+
+An item's weight is its smoothed error rate (failures + 1) / (answers + 2),
+an item never answered weighing UNSEEN_WEIGHT. That rate fades with the
+time since the last answer: it counts fully right after the answer and
+the weight then drifts back to UNSEEN_WEIGHT (over about RECENCY_SCALE
+seconds), so an item known well weighs little, an item failed often
+weighs much, and neither ends up on the wrong side of an item never seen.
+"""
+
+import math
+
+RECENCY_SCALE = 86400.0
+UNSEEN_WEIGHT = 0.5
+MIN_WEIGHT = 0.01
+# Below this, the total weight is rounding error: nothing is left to draw.
+EPSILON = 1e-9
+
+
+def error_weight(good: int, bad: int, last_answer: float | None, now: float) -> float:
+    if good + bad == 0:
+        return UNSEEN_WEIGHT
+    rate = (bad + 1) / (good + bad + 2)
+    retention = 0.0 if last_answer is None else math.exp(-max(now - last_answer, 0.0) / RECENCY_SCALE)
+    return max(MIN_WEIGHT, UNSEEN_WEIGHT + (rate - UNSEEN_WEIGHT) * retention)
+
+
+class FenwickTree:
+    def __init__(self, weights: list[float]):
+        self.weights = list(weights)
+        self._tree = [0.0] + self.weights
+        size = len(self._tree)
+        for index in range(1, size):
+            parent = index + (index & -index)
+            if parent < size:
+                self._tree[parent] += self._tree[index]
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def total(self) -> float:
+        return self.prefix_sum(len(self.weights))
+
+    def prefix_sum(self, count: int) -> float:
+        """Sum of the first count weights."""
+        total = 0.0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def update(self, index: int, weight: float) -> None:
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def find(self, value: float) -> int | None:
+        """Index of the item whose cumulated weight range holds value, in
+        [0, total()); never an item of weight 0 (None when all are 0)."""
+        position = 0
+        step = 1 << (len(self.weights).bit_length())
+        while step:
+            following = position + step
+            if following < len(self._tree) and self._tree[following] <= value:
+                position = following
+                value -= self._tree[following]
+            step >>= 1
+        # Rounding may land on an empty slot: take the nearest weighted one.
+        for index in range(min(position, len(self.weights) - 1), -1, -1):
+            if self.weights[index] > 0.0:
+                return index
+        for index in range(position + 1, len(self.weights)):
+            if self.weights[index] > 0.0:
+                return index
+        return None
+
+    def draw(self, rng) -> int | None:
+        """Random index, with probability proportional to its weight (None when all are 0)."""
+        total = self.total()
+        if total < EPSILON:
+            return None
+        return self.find(rng.random() * total)
@@ -0,0 +1,89 @@
+"""
+Spaced repetition: when an item should be asked again.
+
+Each item asked for a field has a review state, stored in a progress
+journal (schedule_<field>.journal) as [ease, interval, repetitions,
+lapses, due]: the SM-2 ease factor, the current interval in days (how long
+the item is expected to stay remembered), the number of successful
+reviews in a row, the number of failures, and the due time (epoch seconds).
+
+The items of a review session are kept in a DueQueue: a heap ordered by
+due time, so the next item to ask is found in O(log n) whatever the size
+of the corpus. Items never seen before wait in a separate queue and are
+introduced a few at a time.
+"""
+
+import heapq
+import itertools
+from collections import deque
+from typing import Any
+
+DAY = 86400.0
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+# Review state positions.
+EASE, INTERVAL, REPETITIONS, LAPSES, DUE = range(5)
+
+
+def quality(is_ok: bool, ratio: float | None, help_used: bool) -> int:
+    """SM-2 grade (0-5) of the first answer to an item in a session."""
+    if not is_ok:
+        return 1 if ratio else 0
+    if help_used:
+        return 3
+    return 5 if ratio == 1.0 else 4
+
+
+def review(state: list | None, grade: int, now: float) -> list:
+    """State after answering with grade at time now (state None: first review)."""
+    ease, interval, repetitions, lapses, _ = state if state is not None else [INITIAL_EASE, 0.0, 0, 0, now]
+    if grade < 3:
+        repetitions = 0
+        lapses += 1
+        interval = 1.0
+    else:
+        repetitions += 1
+        interval = 1.0 if repetitions == 1 else 6.0 if repetitions == 2 else interval * ease
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return [ease, interval, repetitions, lapses, now + interval * DAY]
+
+
+class DueQueue:
+    """Items by due time, plus the new items in the order they were added."""
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, Any]] = []
+        self._new: deque = deque()
+        self._order = itertools.count()
+
+    def add(self, item, state: list | None) -> None:
+        """Add item with its review state; call heapify() once every item is added."""
+        if state is None:
+            self._new.append(item)
+        else:
+            self._heap.append((state[DUE], next(self._order), item))
+
+    def heapify(self) -> None:
+        heapq.heapify(self._heap)
+
+    def push(self, item, state: list) -> None:
+        heapq.heappush(self._heap, (state[DUE], next(self._order), item))
+
+    def pop_due(self, now: float):
+        """Item due at now with the oldest due time, or None."""
+        if self._heap and self._heap[0][0] <= now:
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    def pop_new(self):
+        return self._new.popleft() if self._new else None
+
+    def next_due(self) -> float | None:
+        return self._heap[0][0] if self._heap else None
+
+    def due_items(self, now: float) -> list:
+        return [item for due, _, item in self._heap if due <= now]
+
+    def new_count(self) -> int:
+        return len(self._new)
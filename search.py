@@ -0,0 +1,82 @@
+"""
+Fuzzy text search through a character trigram inverted index.
+
+Every text is cut into the trigrams of its lowercased, space padded form
+("rule" -> "  r", " ru", "rul", "ule", "le "), and each trigram maps to the
+documents containing it. A query only visits the documents sharing at
+least one trigram with it, so a search costs the length of a few posting
+lists, not a pass over the whole corpus. Matches are ranked by the Dice
+coefficient of the trigram sets, 2 * shared / (query + document trigrams):
+1.0 for the same text, lower as the texts differ.
+
+Documents are added and removed one at a time, so the index follows the
+overlay meanings as they are added.
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from typing import Any, Hashable
+
+MIN_SCORE = 0.3
+
+
+def trigrams(text: str) -> frozenset[str]:
+    text = " ".join(text.lower().split())
+    if not text:
+        return frozenset()
+    padded = f"  {text} "
+    return frozenset(padded[index:index + 3] for index in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """Texts by trigram; each text is a document belonging to a key, with
+    an optional label (where the text comes from), and a search returns the
+    best document of each key."""
+
+    def __init__(self):
+        self.postings: dict[str, set[int]] = defaultdict(set)
+        self.documents: dict[int, tuple[Hashable, Any, str, int]] = {}
+        self._next_document = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, key: Hashable, text: str, label: Any = None) -> int | None:
+        """Index text for key; returns its document number (None for a blank text)."""
+        grams = trigrams(text)
+        if not grams:
+            return None
+        document = self._next_document
+        self._next_document += 1
+        self.documents[document] = (key, label, text, len(grams))
+        for gram in grams:
+            self.postings[gram].add(document)
+        return document
+
+    def remove(self, document: int) -> None:
+        _, _, text, _ = self.documents.pop(document)
+        for gram in trigrams(text):
+            postings = self.postings[gram]
+            postings.discard(document)
+            if not postings:
+                del self.postings[gram]
+
+    def search(self, query: str, limit: int = 10,
+               min_score: float = MIN_SCORE) -> list[tuple[float, Hashable, Any, str]]:
+        """Up to limit (score, key, label, text), best first, scoring at least min_score."""
+        grams = trigrams(query)
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            postings = self.postings.get(gram)
+            if postings:
+                shared.update(postings)
+        best: dict[Hashable, tuple[float, int]] = {}
+        for document, count in shared.items():
+            key, _, _, size = self.documents[document]
+            score = 2.0 * count / (len(grams) + size)
+            if score >= min_score and score > best.get(key, (0.0, None))[0]:
+                best[key] = (score, document)
+        ranked = heapq.nlargest(limit, best.values(), key=lambda entry: entry[0])
+        return [(score, *self.documents[document][:3]) for score, document in ranked]
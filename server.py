@@ -0,0 +1,282 @@
+"""
+HTTP front end serving many training sessions from a single process.
+
+All sessions share one corpus, loaded once at startup; each learner only
+costs its Session (the questions of its selection and its counters) and,
+with a "profile", the journals of that profile (see training.Corpus),
+forgotten once none of its sessions is left. The
+server runs on asyncio, every request is handled without blocking the
+others. Bodies are JSON:
+
+    POST   /sessions               {"mode": "v", "test": "w", "pos": "all",
+                                    "exercise": 1, "jlpt": "5", "block": 1, "seed": 7,
+                                    "choices": 4, "profile": "alice"}
+                                   -> {"session": id, "question": {...}}
+    GET    /sessions/<id>          -> {"question": {...}, "summary": {...}}
+    POST   /sessions/<id>/answer   {"response": "to eat"}
+                                   -> {"answer": {...}, "question": {...}}
+    POST   /sessions/<id>/command  {"command": "-a to eat"} -> {"message": "..."}
+    DELETE /sessions/<id>          -> {"summary": {...}}
+    GET    /search?q=rule&limit=10&profile=alice
+                                   -> {"matches": [{"id": ..., "score": ...}, ...]}
+
+The options of POST /sessions are the answers of the terminal prompts
+(see training.create_session) and the progress profile, the default one
+when left out; "question" is null once the session is over.
+With "choices", word questions list the answers to choose from in
+"choices" and the response can be the number of one of them.
+Sessions left idle for SESSION_TIMEOUT seconds are dropped.
+
+Usage:
+    python server.py [--host 127.0.0.1] [--port 8080]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from urllib.parse import parse_qs
+
+from training import Answer, Corpus, Kanji, Session, Word, create_session
+
+SESSION_TIMEOUT = 3600.0
+MAX_BODY_SIZE = 64 * 1024
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+def question_payload(session: Session) -> dict | None:
+    question = session.next_question()
+    if question is None:
+        return None
+    item = question.item
+    remaining_kanji, remaining_word = session.remaining()
+    payload = {
+        "id": item.id,
+        "number": session.current[1],
+        "total": session.questions_length_initial,
+        "remaining": {"kanji": remaining_kanji, "word": remaining_word},
+        "jlpt": question.jlpt(),
+        "shown": {field: getattr(item, field) for field in question.field[1]},
+        "field": question.field[0],
+        "choices": None if question.choices is None else
+                   [getattr(choice, question.field[0]) for choice in question.choices],
+        "help": None,
+    }
+    if session.help_shown:
+        if isinstance(item, Word):
+            payload["help"] = {"kanji": {kanji.kanji: kanji.meanings for kanji in item.kanjis}}
+        else:
+            payload["help"] = {"radicals": item.radicals.split(";") if item.radicals else []}
+    return payload
+
+
+def answer_payload(answer: Answer) -> dict:
+    return {
+        "graded": answer.graded,
+        "ok": answer.is_ok,
+        "ratio": answer.ratio,
+        "expected": getattr(answer.question.item, answer.question.field[0]) if answer.graded else None,
+    }
+
+
+def match_payload(score: float, item: Kanji | Word, source: str, text: str) -> dict:
+    return {
+        "id": item.id,
+        "item": str(item),
+        "score": score,
+        "source": source,
+        "text": text,
+    }
+
+
+def summary_payload(session: Session) -> dict:
+    total_answer = session.good_answer + session.bad_answer
+    return {
+        "good": session.good_answer,
+        "bad": session.bad_answer,
+        "average": session.score / total_answer if total_answer > 0 else None,
+        "failed": [
+            {
+                "number": failure["question_number"],
+                "shown": [getattr(question.item, field) for field in question.field[1]],
+                "field": question.field[0],
+                "expected": getattr(question.item, question.field[0]),
+                "attempts": [{"response": response, "ratio": ratio} for response, ratio in failure["attempts"]],
+            }
+            for question, failure in session.failed_questions.items()
+        ],
+    }
+
+
+class SessionServer:
+    def __init__(self, corpus: Corpus, session_timeout: float = SESSION_TIMEOUT):
+        self.corpus = corpus
+        self.session_timeout = session_timeout
+        self.sessions: dict[str, Session] = {}
+        self.last_seen: dict[str, float] = {}
+        self.profiles: dict[str, Corpus] = {}
+
+    def profile(self, name: str | None) -> Corpus:
+        """Corpus of the progress profile name (None for the default one)."""
+        if name is None:
+            return self.corpus
+        if name not in self.profiles:
+            self.profiles[name] = self.corpus.profile(name)
+        return self.profiles[name]
+
+    def dispatch(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        path, _, query = path.partition("?")
+        parts = [part for part in path.split("/") if part]
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {"error": "Body is not valid JSON."}
+        if not isinstance(data, dict):
+            return 400, {"error": "Body must be a JSON object."}
+        if parts == ["search"]:
+            if method != "GET":
+                return 405, {"error": "Use GET to search."}
+            return self.search(parse_qs(query))
+        if not parts or parts[0] != "sessions" or len(parts) > 3:
+            return 404, {"error": "Not found."}
+
+        if len(parts) == 1:
+            if method != "POST":
+                return 405, {"error": "Use POST to create a session."}
+            try:
+                session = create_session(self.profile(data.get("profile")), data)
+            except (ValueError, TypeError, IndexError, ImportError) as error:
+                return 400, {"error": str(error)}
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = session
+            self.last_seen[session_id] = time.monotonic()
+            return 201, {"session": session_id, "question": question_payload(session)}
+
+        session_id = parts[1]
+        session = self.sessions.get(session_id)
+        if session is None:
+            return 404, {"error": "Unknown or expired session."}
+        self.last_seen[session_id] = time.monotonic()
+        action = parts[2] if len(parts) == 3 else None
+
+        if action is None and method == "GET":
+            return 200, {"question": question_payload(session), "summary": summary_payload(session)}
+        if action is None and method == "DELETE":
+            del self.sessions[session_id]
+            del self.last_seen[session_id]
+            return 200, {"summary": summary_payload(session)}
+        if action == "answer" and method == "POST":
+            if session.next_question() is None:
+                return 400, {"error": "The session is over."}
+            answer = session.submit(str(data.get("response", "")))
+            return 200, {"answer": answer_payload(answer), "question": question_payload(session)}
+        if action == "command" and method == "POST":
+            message = session.command(str(data.get("command", "")))
+            if message is None:
+                return 400, {"error": "Not a command."}
+            return 200, {"message": message, "question": question_payload(session)}
+        if action in [None, "answer", "command"]:
+            return 405, {"error": "Method not allowed."}
+        return 404, {"error": "Not found."}
+
+    def search(self, query: dict[str, list[str]]) -> tuple[int, dict]:
+        text = query.get("q", [""])[0]
+        if not text.strip():
+            return 400, {"error": "Give the text to search as q."}
+        try:
+            limit = int(query.get("limit", ["10"])[0])
+        except ValueError:
+            return 400, {"error": "limit must be a number."}
+        try:
+            corpus = self.profile(query.get("profile", [None])[0])
+        except ValueError as error:
+            return 400, {"error": str(error)}
+        return 200, {"matches": [match_payload(*match) for match in corpus.search(text, limit)]}
+
+    def drop_idle_sessions(self) -> None:
+        deadline = time.monotonic() - self.session_timeout
+        for session_id in [session_id for session_id, seen in self.last_seen.items() if seen < deadline]:
+            del self.sessions[session_id]
+            del self.last_seen[session_id]
+        in_use = {session.corpus.profile_name for session in self.sessions.values()}
+        for name in [name for name in self.profiles if name not in in_use]:
+            self.profiles.pop(name).close()
+
+    async def sweep(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.session_timeout, 60.0))
+            self.drop_idle_sessions()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    status, payload = 413, {"error": "Body too large."}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = self.dispatch(method, path, body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _response(status: int, payload: dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve(host: str, port: int) -> None:
+    corpus = Corpus()
+    # Load the shared layers once, before the first learner connects.
+    corpus.word_index
+    corpus.kanji_index
+    corpus.search_index
+    # Built on first use otherwise (NumPy, over a second), inside a request.
+    try:
+        corpus.shared.neighbours
+    except ImportError as error:
+        print(f"Distractors not loaded, sessions with choices are refused: {error}")
+    server = SessionServer(corpus)
+    sweeper = asyncio.create_task(server.sweep())
+    tcp_server = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"Serving training sessions on http://{host}:{port}")
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        sweeper.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve training sessions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
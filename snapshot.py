@@ -0,0 +1,225 @@
+"""
+Versioned binary snapshot of the corpus, so starting a training session
+does not re-parse all_hiragana_with_pos.csv and kanji.json every time.
+
+The snapshot file holds one section per source file. Each section stores
+the parsed columns (with derived fields such as the JLPT level already
+converted) together with a fingerprint of its source. A section is
+recompiled automatically as soon as its source changes: the size and
+mtime are checked first, and the content hash decides when they differ.
+The distractors section (the nearest neighbours of every word, for
+multiple choice questions) is derived from the words section and only
+compiled when it is first needed.
+
+Usage:
+    python snapshot.py
+    (force a rebuild of every section)
+"""
+
+import csv
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+from pathlib import Path
+from typing import Iterable
+
+import distractors
+from kana import has_katakana
+
+SNAPSHOT_VERSION = 5
+SNAPSHOT_FILE = ".corpus.snapshot"
+
+_MAGIC = b"JLPTSNAP"
+_PREAMBLE = struct.Struct("<8sII")  # magic, version, header length
+
+
+def word_id(word: str, kana: str) -> str:
+    """Stable identifier of a word, derived from its writing and reading
+    rather than its row, or its meaning (which gets fixed by hand)."""
+    return hashlib.sha1(f"{word}\t{kana}".encode("utf-8")).hexdigest()[:12]
+
+
+def legacy_word_id(word: str, kana: str, meaning: str) -> str:
+    """Identifier of a word up to version 4 of the snapshot, which hashed the meaning too."""
+    return hashlib.sha1(f"{word}\t{kana}\t{meaning}".encode("utf-8")).hexdigest()[:12]
+
+
+def unique_ids(ids: Iterable[str]) -> list[str]:
+    """ids, each one seen before suffixed with its occurrence (#2, #3...)."""
+    occurrences: dict[str, int] = {}
+    unique = []
+    for item_id in ids:
+        occurrence = occurrences[item_id] = occurrences.get(item_id, 0) + 1
+        unique.append(item_id if occurrence == 1 else f"{item_id}#{occurrence}")
+    return unique
+
+
+def compile_words(path: Path) -> dict[str, list]:
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)  # Ignore la première ligne (en-tête)
+        return compile_word_rows(reader)
+
+
+def compile_word_rows(rows: Iterable[list[str]]) -> dict[str, list]:
+    """Columns of the words section for the rows of all_hiragana_with_pos.csv (header excluded)."""
+    # Parts of speech, tags and transitivity repeat a lot: each distinct value
+    # is stored once and pickle keeps the sharing when the snapshot is loaded.
+    shared_values: dict[str, str] = {}
+    shared_lists: dict[str, tuple[str, ...]] = {}
+    columns = {name: [] for name in
+               ("id", "word", "kana", "romaji", "meaning", "jlpt_level", "kinds", "tags", "transitivity",
+                "has_katakana")}
+    for row in rows:
+        # row = [expression, reading, romaji, meaning, tags, kinds, tags, transitivity]
+        if len(row) != 8:
+            raise Exception("Malformed line : " + str(row))
+        word, kana, romaji, meaning, jlpt_level, kinds, tags, transitivity = row
+        columns["id"].append(word_id(word, kana))
+        columns["word"].append(word)
+        columns["kana"].append(kana)
+        columns["romaji"].append(romaji)
+        columns["meaning"].append(meaning)
+        columns["jlpt_level"].append(int(jlpt_level.replace("JLPT_", "")))
+        for name, value in (("kinds", kinds), ("tags", tags)):
+            if value not in shared_lists:
+                shared_lists[value] = tuple(shared_values.setdefault(part, part) for part in value.split(';'))
+            columns[name].append(shared_lists[value])
+        columns["transitivity"].append(None if transitivity == "" else shared_values.setdefault(transitivity, transitivity))
+        columns["has_katakana"].append(has_katakana(word))
+    # Homographs, or the same row twice in the CSV: still give each word its own id.
+    columns["id"] = unique_ids(columns["id"])
+    return columns
+
+
+def compile_kanji(path: Path) -> dict[str, list]:
+    columns = {name: [] for name in
+               ("kanji", "strokes", "grade", "freq", "jlpt_old", "jlpt_new", "meanings", "radicals")}
+    with open(path, "r", encoding="utf-8") as f:
+        for kanji, element in json.load(f).items():
+            columns["kanji"].append(kanji)
+            columns["strokes"].append(int(element["strokes"]))
+            for name in ("grade", "freq", "jlpt_old", "jlpt_new"):
+                columns[name].append(None if element[name] is None else int(element[name]))
+            columns["meanings"].append(";".join(element["meanings"]))
+            columns["radicals"].append(None if element["wk_radicals"] is None else ";".join(element["wk_radicals"]))
+    return columns
+
+
+def compile_distractors(path: Path) -> dict[str, list]:
+    """Nearest neighbours of every word (see distractors.py, needs NumPy)."""
+    columns = load("words", path.parent)
+    return {"neighbours": distractors.nearest_neighbours(columns)}
+
+
+# Section name -> (source file, compiler).
+SECTIONS = {
+    "words": ("all_hiragana_with_pos.csv", compile_words),
+    "kanji": ("kanji.json", compile_kanji),
+    "distractors": ("all_hiragana_with_pos.csv", compile_distractors),
+}
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _hash_file(path)}
+
+
+def _is_fresh(path: Path, fingerprint: dict) -> bool:
+    stat = path.stat()
+    if stat.st_size == fingerprint["size"] and stat.st_mtime_ns == fingerprint["mtime_ns"]:
+        return True
+    # Touched but maybe not modified (checkout, copy...): trust the content.
+    return stat.st_size == fingerprint["size"] and _hash_file(path) == fingerprint["sha256"]
+
+
+def _read(snapshot_path: Path) -> tuple[dict, dict[str, bytes]]:
+    """Header and raw section payloads of an existing snapshot, or empty ones
+    when the file is missing, corrupted or written by another version."""
+    try:
+        with open(snapshot_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, header_length = _PREAMBLE.unpack_from(mm, 0)
+            if magic != _MAGIC or version != SNAPSHOT_VERSION:
+                return {}, {}
+            header = pickle.loads(mm[_PREAMBLE.size:_PREAMBLE.size + header_length])
+            base = _PREAMBLE.size + header_length
+            payloads = {name: mm[base + section["offset"]:base + section["offset"] + section["length"]]
+                        for name, section in header.items()}
+            return header, payloads
+    except (OSError, ValueError, struct.error, pickle.UnpicklingError, EOFError):
+        return {}, {}
+
+
+def _write(snapshot_path: Path, header: dict, payloads: dict[str, bytes]) -> None:
+    offset = 0
+    for name, payload in payloads.items():
+        header[name]["offset"] = offset
+        header[name]["length"] = len(payload)
+        offset += len(payload)
+    header_bytes = pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            for payload in payloads.values():
+                f.write(payload)
+        os.replace(tmp_path, snapshot_path)
+    except OSError:
+        # Read-only checkout: run from the sources, just without the cache.
+        tmp_path.unlink(missing_ok=True)
+
+
+def load(section: str, root: Path = Path("."), rebuild: bool = False) -> dict[str, list]:
+    """Columns of one section, recompiled from its source when stale."""
+    source_name, compiler = SECTIONS[section]
+    source = root / source_name
+    snapshot_path = root / SNAPSHOT_FILE
+
+    header, payloads = _read(snapshot_path)
+    if not rebuild and section in header and _is_fresh(source, header[section]["source"]):
+        return pickle.loads(payloads[section])
+
+    columns = compiler(source)
+    # The compiler may have stored other sections it depends on.
+    header, payloads = _read(snapshot_path)
+    _store(snapshot_path, header, payloads, section, source, columns)
+    return columns
+
+
+def store(section: str, columns: dict[str, list], root: Path = Path(".")) -> None:
+    """Save columns compiled elsewhere (by the corpus build) as the section
+    of the source file currently on disk."""
+    header, payloads = _read(root / SNAPSHOT_FILE)
+    _store(root / SNAPSHOT_FILE, header, payloads, section, root / SECTIONS[section][0], columns)
+
+
+def _store(snapshot_path: Path, header: dict, payloads: dict[str, bytes], section: str, source: Path,
+           columns: dict[str, list]) -> None:
+    header[section] = {"source": _fingerprint(source)}
+    payloads[section] = pickle.dumps(columns, protocol=pickle.HIGHEST_PROTOCOL)
+    _write(snapshot_path, header, payloads)
+
+
+def build(root: Path = Path(".")) -> None:
+    for section in SECTIONS:
+        try:
+            load(section, root, rebuild=True)
+        except ImportError as error:
+            print(f"Section {section} not built: {error}")
+
+
+if __name__ == "__main__":
+    build()
+    print("Done. Snapshot written to", SNAPSHOT_FILE)
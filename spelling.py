@@ -0,0 +1,156 @@
+"""
+Romaji spellings accepted for a kana reading.
+
+Romaji questions only accepted the cutlet romanization stored in
+all_hiragana_with_pos.csv, character for character. A RomajiAutomaton,
+compiled from the word's kana, accepts every usual spelling of it instead:
+
+- Hepburn, Kunrei and Nihon-shiki syllables (shi/si, tsu/tu, chi/ti,
+  fu/hu, ja/zya/jya, ji/di for ぢ...);
+- long vowels doubled, with a macron or a circumflex, and oh/oo for おう;
+- the syllabic n as n, n' or nn, or m before b, m and p (a bare n before
+  a vowel is ambiguous in general, not against one known reading, and it
+  is what cutlet writes);
+- the small tsu as a doubled consonant (tch or cch before ch).
+
+The automaton is a DFA over the characters of the response, so checking an
+answer costs one dict lookup per character. Automata are compiled once per
+reading and cached.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+from kana import DIGRAPHS, LONG_VOWELS, ROMAJI, VOWELS, to_hiragana
+
+_LABIALS = "bmp"
+
+
+def normalize_response(response: str) -> str:
+    return unicodedata.normalize("NFC", response).lower().replace(" ", "")
+
+
+def _kana_edges(kana: str) -> list[list[tuple[int, str]]] | None:
+    """edges[p]: the (q, spelling) reading kana[p:q] as spelling; None when
+    kana holds a character that has no romaji."""
+    edges: list[list[tuple[int, str]]] = [[] for _ in kana]
+    # Backwards: a small tsu doubles the spellings found after it.
+    for position in range(len(kana) - 1, -1, -1):
+        char = kana[position]
+        following = kana[position + 1] if position + 1 < len(kana) else ""
+        spellings = edges[position]
+        if char + following in DIGRAPHS:
+            spellings += [(position + 2, spelling) for spelling in DIGRAPHS[char + following]]
+        if char in ROMAJI:
+            spellings += [(position + 1, spelling) for spelling in ROMAJI[char]]
+        elif char == "っ":
+            for end, spelling in (edges[position + 1] if following else []):
+                if spelling and spelling[0] not in VOWELS + "n'-~":
+                    spellings.append((end, spelling[0] + spelling))
+                    if spelling.startswith("ch"):
+                        spellings.append((end, "t" + spelling))
+            if not spellings:
+                spellings += [(position + 1, ""), (position + 1, "t")]
+        elif char == "ん":
+            spellings += [(position + 1, "n"), (position + 1, "n'"), (position + 1, "nn")]
+            if following and any(spelling[:1] in _LABIALS for _, spelling in edges[position + 1]):
+                spellings.append((position + 1, "m"))
+        elif char == "ー":
+            spellings.append((position + 1, "-"))
+        elif char in "～〜":
+            spellings += [(position + 1, ""), (position + 1, "~")]
+        else:
+            return None
+    for position, spellings in enumerate(edges):
+        for end, spelling in list(spellings):
+            if end < len(kana) and spelling and (spelling[-1], kana[end]) in LONG_VOWELS:
+                spellings += [(end + 1, spelling[:-1] + long_vowel)
+                              for long_vowel in LONG_VOWELS[(spelling[-1], kana[end])]]
+    return edges
+
+
+class RomajiAutomaton:
+    """DFA accepting the romaji spellings of one or several kana readings."""
+
+    __slots__ = ("transitions", "accepting")
+
+    def __init__(self, readings: list[list[list[tuple[int, str]]]]):
+        """readings: the kana edges of each reading (see _kana_edges())."""
+        # Character level NFA: node 0 is the start, each reading adds its kana
+        # positions then one node per inner character of its spellings.
+        moves: list[dict[str, set[int]]] = [{}]
+        epsilon: list[set[int]] = [set()]
+        finals = set()
+
+        def new_node() -> int:
+            moves.append({})
+            epsilon.append(set())
+            return len(moves) - 1
+
+        for edges in readings:
+            nodes = [new_node() for _ in range(len(edges) + 1)]
+            epsilon[0].add(nodes[0])
+            finals.add(nodes[-1])
+            for position, spellings in enumerate(edges):
+                for end, spelling in spellings:
+                    node = nodes[position]
+                    if not spelling:
+                        epsilon[node].add(nodes[end])
+                        continue
+                    for char in spelling[:-1]:
+                        following = new_node()
+                        moves[node].setdefault(char, set()).add(following)
+                        node = following
+                    moves[node].setdefault(spelling[-1], set()).add(nodes[end])
+
+        def closure(nodes: set[int]) -> frozenset[int]:
+            stack, seen = list(nodes), set(nodes)
+            while stack:
+                for following in epsilon[stack.pop()] - seen:
+                    seen.add(following)
+                    stack.append(following)
+            return frozenset(seen)
+
+        start = closure({0})
+        states = {start: 0}
+        self.transitions: list[dict[str, int]] = [{}]
+        self.accepting: set[int] = set()
+        pending = [start]
+        while pending:
+            nodes = pending.pop()
+            state = states[nodes]
+            if not finals.isdisjoint(nodes):
+                self.accepting.add(state)
+            targets: dict[str, set[int]] = {}
+            for node in nodes:
+                for char, following in moves[node].items():
+                    targets.setdefault(char, set()).update(following)
+            for char, following in targets.items():
+                following = closure(following)
+                if following not in states:
+                    states[following] = len(self.transitions)
+                    self.transitions.append({})
+                    pending.append(following)
+                self.transitions[state][char] = states[following]
+
+    def accepts(self, response: str) -> bool:
+        state = 0
+        transitions = self.transitions
+        for char in normalize_response(response):
+            state = transitions[state].get(char)
+            if state is None:
+                return False
+        return state in self.accepting
+
+
+@lru_cache(maxsize=None)
+def automaton(kana: str) -> RomajiAutomaton | None:
+    """Automaton of the readings of kana (';' separated, notes in parentheses
+    ignored as the grader does); None when no reading can be romanized."""
+    readings = []
+    for reading in re.sub(r'\s*\(.*?\)\s*', '', kana).split(";"):
+        edges = _kana_edges(to_hiragana(reading.replace(" ", "")))
+        if edges:
+            readings.append(edges)
+    return RomajiAutomaton(readings) if readings else None
@@ -0,0 +1,127 @@
+import math
+
+import pytest
+
+from events import RECORD, EventLog, report
+
+pytest.importorskip("numpy")
+
+DAY = 86400.0
+
+
+class Item:
+    def __init__(self, level, kinds=None, tags=()):
+        self.level = level
+        if kinds is not None:
+            self.kinds = kinds
+            self.tags = tags
+
+    def jlpt(self):
+        return self.level
+
+
+class FakeCorpus:
+    items = {"w1": Item(5, ("verb",), ("common",)), "w2": Item(5, ("noun",)), "k1": Item(4)}
+
+    def item(self, item_id):
+        return self.items.get(item_id)
+
+
+EVENTS = [
+    # item, field, right, latency, time
+    ("w1", "meaning", True, 1.0, 0.0),
+    ("w1", "meaning", False, 3.0, 30.0),
+    ("w1", "meaning", True, 2.0, 30.0 + 7200.0),
+    ("w1", "romaji", True, 0.5, 10.0),
+    ("w2", "meaning", False, 4.0, 0.0),
+    ("w2", "meaning", False, None, 100.0),
+    ("w2", "meaning", True, 5.0, 100.0 + 2 * DAY),
+    ("k1", "meanings", True, 1.0, 0.0),
+    ("gone", "meaning", False, 9.0, 0.0),
+]
+
+RETENTION = [
+    # bucket -> answers, accuracy
+    ("1 min", 1, 0.0),
+    ("10 min", 1, 0.0),
+    ("1 hour", 0, None),
+    ("1 day", 1, 1.0),
+    ("1 week", 1, 1.0),
+    ("1 month", 0, None),
+    ("more", 0, None),
+]
+
+GROUPS = [
+    # grouping, group -> answers, accuracy, mean latency, weakest, slowest
+    ("jlpt", "N4", 1, 1.0, 1.0, [], []),
+    ("jlpt", "N5", 7, 4 / 7, 15.5 / 6, [("w2", "meaning"), ("w1", "meaning")], [("w2", "meaning"), ("w1", "meaning")]),
+    ("pos", "kanji", 1, 1.0, 1.0, [], []),
+    ("pos", "noun", 3, 1 / 3, 4.5, [("w2", "meaning")], [("w2", "meaning")]),
+    ("pos", "verb", 4, 3 / 4, 6.5 / 4, [("w1", "meaning")], [("w1", "meaning")]),
+    ("tag", "common", 4, 3 / 4, 6.5 / 4, [("w1", "meaning")], [("w1", "meaning")]),
+]
+
+
+@pytest.fixture
+def events(tmp_path):
+    log = EventLog(tmp_path / "answers.events")
+    for item_id, field_name, right, latency, timestamp in EVENTS:
+        log.append(item_id, field_name, right, 1.0 if right else 0.5, latency, timestamp=timestamp)
+    log.close()
+    return log.read()
+
+
+def test_totals(events):
+    result = report(events, FakeCorpus())
+    assert result["answers"] == len(EVENTS)
+    assert result["accuracy"] == pytest.approx(5 / 9)
+    assert result["median_latency"] == 2.5
+
+
+@pytest.mark.parametrize("after, answers, accuracy", RETENTION)
+def test_retention(events, after, answers, accuracy):
+    bucket = {bucket["after"]: bucket for bucket in report(events, FakeCorpus())["retention"]}[after]
+    assert (bucket["answers"], bucket["accuracy"]) == (answers, accuracy)
+
+
+@pytest.mark.parametrize("grouping, name, answers, accuracy, mean_latency, weakest, slowest", GROUPS)
+def test_groups(events, grouping, name, answers, accuracy, mean_latency, weakest, slowest):
+    groups = report(events, FakeCorpus())["groups"][grouping]
+    group = {group["group"]: group for group in groups}[name]
+    assert group["answers"] == answers
+    assert group["accuracy"] == pytest.approx(accuracy)
+    assert group["mean_latency"] == pytest.approx(mean_latency)
+    assert [(entry["item"], entry["field"]) for entry in group["weakest"]] == weakest
+    assert [(entry["item"], entry["field"]) for entry in group["slowest"]] == slowest
+
+
+def test_groups_are_sorted_and_complete(events):
+    groups = report(events, FakeCorpus())["groups"]
+    assert {grouping: [group["group"] for group in groups[grouping]] for grouping in groups} == \
+        {grouping: sorted(name for other, name, *_ in GROUPS if other == grouping) for grouping in groups}
+
+
+def test_top(events):
+    group = report(events, FakeCorpus(), top=1)["groups"]["jlpt"][1]
+    assert [entry["item"] for entry in group["weakest"]] == ["w2"]
+    assert group["weakest"][0]["median_latency"] == 4.5
+
+
+def test_empty(tmp_path):
+    result = report(EventLog(tmp_path / "answers.events").read(), FakeCorpus())
+    assert (result["answers"], result["accuracy"], result["median_latency"]) == (0, None, None)
+
+
+def test_torn_record(tmp_path):
+    path = tmp_path / "answers.events"
+    log = EventLog(path)
+    log.append("w1", "meaning", True, 1.0, timestamp=0.0)
+    log.close()
+    with path.open("ab") as f:
+        f.write(b"\0" * (RECORD.size // 2))
+    assert len(log.read()) == 1
+    log.append("w1", "meaning", False, None, timestamp=1.0)
+    log.close()
+    events = log.read()
+    assert events["item"].tolist() == [b"w1", b"w1"]
+    assert math.isnan(events["ratio"][1])
@@ -0,0 +1,90 @@
+import csv
+import random
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import pytest
+
+from grader import EXACT_LIMIT, FORBID_LIMIT, MEANING_LIMIT, Grader, grade_batch
+from training import check_field
+
+WORDS_FILE = Path(__file__).resolve().parent.parent / "all_hiragana_with_pos.csv"
+
+
+def reference(response, solutions, forbids, should_be_exact):
+    """What check_field() computes, spelled out with difflib."""
+    if any(SequenceMatcher(None, forbid, response).ratio() > FORBID_LIMIT for forbid in forbids):
+        return False, 0.0
+    ratio = max((SequenceMatcher(None, solution, response).ratio() for solution in solutions), default=0.0)
+    return ratio >= (EXACT_LIMIT if should_be_exact else MEANING_LIMIT), ratio
+
+
+def mutate(text, rng):
+    """text with one character dropped, doubled or replaced."""
+    if not text:
+        return rng.choice("ae")
+    position = rng.randrange(len(text))
+    kind = rng.randrange(3)
+    if kind == 0:
+        return text[:position] + text[position + 1:]
+    if kind == 1:
+        return text[:position] + text[position] + text[position:]
+    return text[:position] + rng.choice("aeiostn") + text[position + 1:]
+
+
+def random_cases(count, seed=0):
+    rng = random.Random(seed)
+
+    def text():
+        return "".join(rng.choice("abcab あいー") for _ in range(rng.randrange(0, 12)))
+
+    cases = []
+    for _ in range(count):
+        solutions = [text() for _ in range(rng.randrange(0, 4))]
+        forbids = [text() for _ in range(rng.randrange(0, 3))]
+        response = rng.choice([text(), mutate(rng.choice(solutions or [""]), rng),
+                               mutate(rng.choice(forbids or [""]), rng)])
+        cases.append((response, solutions, forbids, rng.random() < 0.3))
+    return cases
+
+
+def corpus_cases(count, seed=0):
+    rng = random.Random(seed)
+    with open(WORDS_FILE, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        rows = [row for _, row in zip(range(2000), reader)]
+    meanings = [[part.strip() for part in row[3].split(";") if part.strip()] for row in rows]
+    cases = []
+    for _ in range(count):
+        solutions = rng.choice(meanings)
+        forbids = [mutate(part, rng) for part in rng.choice(meanings)][:2]
+        response = rng.choice([rng.choice(solutions), mutate(rng.choice(solutions), rng),
+                               mutate(mutate(rng.choice(solutions), rng), rng),
+                               rng.choice(forbids or [""]), rng.choice(rng.choice(meanings))])
+        cases.append((response, solutions, forbids, rng.random() < 0.3))
+    return cases
+
+
+@pytest.mark.parametrize("cases", [random_cases(2000), corpus_cases(2000)], ids=["random", "corpus"])
+def test_check_field_matches_difflib(cases):
+    for case in cases:
+        assert check_field(*case) == reference(*case), case
+
+
+@pytest.mark.parametrize("cases", [random_cases(2000), corpus_cases(2000)], ids=["random", "corpus"])
+def test_grade_batch_matches_check_field(cases):
+    # Every case twice, so that the graders shared by the batch are used again.
+    cases = cases + cases[::-1]
+    assert grade_batch(cases) == [check_field(*case) for case in cases]
+
+
+def test_grade_batch_empty():
+    assert grade_batch([]) == []
+
+
+def test_grader_cache_keeps_results():
+    grader = Grader(["to eat", "to drink"], ["to eats"], False, cache_size=2)
+    responses = ["to eat", "to eta", "to eats", "to drnk", "to eat", "to eta"]
+    assert [grader.grade(response) for response in responses] == \
+        [reference(response, ["to eat", "to drink"], ["to eats"], False) for response in responses]
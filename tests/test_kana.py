@@ -0,0 +1,30 @@
+import pytest
+
+from kana import kana_to_romaji, to_hiragana
+
+ROMAJI = [
+    ("すし", "sushi"), ("ちず", "chizu"), ("ふじ", "fuji"), ("つくえ", "tsukue"),
+    # digraphs
+    ("じゃま", "jama"), ("しゃしん", "shashin"), ("ぎゅうにゅう", "gyuunyuu"), ("りょこう", "ryokou"),
+    # ん before a vowel or y, and before anything else
+    ("きんえん", "kin'en"), ("こんや", "kon'ya"), ("げんいん", "gen'in"), ("かんよう", "kan'you"),
+    ("しんぶん", "shinbun"), ("さんぽ", "sanpo"), ("ほん", "hon"),
+    # っ doubles the next consonant, ch becomes tch
+    ("きって", "kitte"), ("ざっし", "zasshi"), ("いっぱい", "ippai"),
+    ("まっちゃ", "matcha"), ("ぼっちゃん", "botchan"), ("あっ", "a"),
+    # ー repeats the vowel before it
+    ("コーヒー", "koohii"), ("ラーメン", "raamen"), ("らーめん", "raamen"), ("ーあ", "ーa"),
+    # katakana, affix marks and other characters
+    ("ジュース", "juusu"), ("～がわ", "~gawa"), ("〜かた", "~kata"), ("漢字 ABC", "漢字 ABC"), ("", ""),
+]
+
+
+@pytest.mark.parametrize("kana, romaji", ROMAJI)
+def test_kana_to_romaji(kana, romaji):
+    assert kana_to_romaji(kana) == romaji
+
+
+@pytest.mark.parametrize("text, hiragana", [("カタカナ", "かたかな"), ("コーヒー", "こーひー"), ("ひらがな", "ひらがな"),
+                                            ("ヴ漢字", "ゔ漢字")])
+def test_to_hiragana(text, hiragana):
+    assert to_hiragana(text) == hiragana
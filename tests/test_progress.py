@@ -0,0 +1,112 @@
+import pytest
+
+from progress import Journal
+
+REPLAYED = [
+    # journal lines -> entries
+    ('', {}),
+    ('["s",1,"a"]\n["s",2,"b"]\n', {1: "a", 2: "b"}),
+    ('["s","x",1]\n["s","x",2]\n', {"x": 2}),
+    ('["s",1,"a"]\n["d",1]\n["s",2,"b"]\n', {2: "b"}),
+    ('["d",1]\n', {}),
+    # torn last line: dropped, the rest is kept
+    ('["s",1,"a"]\n["s",2,"b', {1: "a"}),
+    ('["s",1,"a"]\n["s",2,"b"]', {1: "a"}),
+    ('["s",1,"a"]\n["s",2,"b"]\nnot json\n["s",3,"c"]\n', {1: "a", 2: "b"}),
+]
+
+LEGACY = [
+    # legacy file, parser -> entries (keyed by line index)
+    ("a\nb\n", str, {0: "a", 1: "b"}),
+    ("1\n\n3\n", int, {0: 1, 2: 3}),
+    ("1\nx\n2\n", lambda line: int(line) if line.isdigit() else None, {0: 1, 2: 2}),
+]
+
+REKEYED = [
+    # entries, new key -> entries
+    ({0: "a", 1: "b"}, lambda key: f"id{key}", {"id0": "a", "id1": "b"}),
+    ({0: "a", 1: "b"}, lambda key: None if key == 0 else key + 10, {11: "b"}),
+    ({}, str, {}),
+]
+
+
+def journal_file(tmp_path, text):
+    path = tmp_path / "burn_meaning.journal"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("text, entries", REPLAYED)
+def test_replay(tmp_path, text, entries):
+    assert Journal(journal_file(tmp_path, text)).entries == entries
+
+
+@pytest.mark.parametrize("text, entries", REPLAYED)
+def test_write_after_replay(tmp_path, text, entries):
+    path = journal_file(tmp_path, text)
+    journal = Journal(path)
+    journal.set("new", 1)
+    journal.close()
+    assert Journal(path).entries == {**entries, "new": 1}
+
+
+def test_torn_tail_is_cut_by_the_next_write(tmp_path):
+    path = journal_file(tmp_path, '["s",1,"a"]\n["s",2,')
+    journal = Journal(path)
+    journal.set(3, "c")
+    journal.close()
+    assert path.read_text(encoding="utf-8").endswith("\n")
+    assert Journal(path).entries == {1: "a", 3: "c"}
+
+
+@pytest.mark.parametrize("text, parse, entries", LEGACY)
+def test_legacy_import(tmp_path, text, parse, entries):
+    legacy = tmp_path / "burn_meaning.txt"
+    legacy.write_text(text, encoding="utf-8")
+    path = tmp_path / "burn_meaning.journal"
+    journal = Journal(path, legacy, parse)
+    assert journal.entries == entries
+    # Opening only reads: the import is written by the first write.
+    assert not path.exists()
+    journal.set("new", 1)
+    journal.close()
+    legacy.write_text("", encoding="utf-8")
+    assert Journal(path, legacy, parse).entries == {**entries, "new": 1}
+
+
+@pytest.mark.parametrize("entries, new_key, rekeyed", REKEYED)
+def test_rekey(tmp_path, entries, new_key, rekeyed):
+    path = tmp_path / "burn_meaning.journal"
+    journal = Journal(path)
+    for key, value in entries.items():
+        journal.set(key, value)
+    journal.rekey(new_key)
+    assert journal.entries == rekeyed
+    journal.set("new", 1)
+    journal.close()
+    assert Journal(path).entries == {**rekeyed, "new": 1}
+
+
+def test_read_only(tmp_path):
+    journal = Journal(tmp_path / "burn_meaning.journal", entries={1: "a"})
+    assert journal.get(1) == "a"
+    with pytest.raises(PermissionError):
+        journal.set(2, "b")
+    assert not (tmp_path / "burn_meaning.journal").exists()
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["append", "compact"])
+def test_writers_never_lose_updates(tmp_path, compact):
+    path = tmp_path / "word_result_meaning.journal"
+    first, second = Journal(path), Journal(path)
+    for step in range(50):
+        for journal in (first, second):
+            journal.update("count", lambda count: count + 1, 0)
+            journal.set(f"{id(journal)}-{step}", step)
+        if compact and step % 10 == 0:
+            first.compact()
+    first.close()
+    second.close()
+    entries = Journal(path).entries
+    assert entries["count"] == 100
+    assert len(entries) == 101
@@ -0,0 +1,90 @@
+import random
+from collections import Counter
+
+import pytest
+
+from sampling import MIN_WEIGHT, RECENCY_SCALE, UNSEEN_WEIGHT, FenwickTree, error_weight
+
+FOUND = [
+    # weights, value -> index
+    ([1.0], 0.0, 0),
+    ([1.0], 0.99, 0),
+    ([1.0, 2.0, 3.0], 0.0, 0),
+    ([1.0, 2.0, 3.0], 1.0, 1),
+    ([1.0, 2.0, 3.0], 2.99, 1),
+    ([1.0, 2.0, 3.0], 3.0, 2),
+    ([1.0, 2.0, 3.0], 5.99, 2),
+    # zero weights are never found
+    ([0.0, 1.0, 0.0, 2.0, 0.0], 0.0, 1),
+    ([0.0, 1.0, 0.0, 2.0, 0.0], 1.0, 3),
+    ([0.0, 1.0, 0.0, 2.0, 0.0], 2.5, 3),
+    # rounding past the total: the nearest weighted item
+    ([0.0, 1.0, 0.0, 2.0, 0.0], 3.0, 3),
+    ([1.0, 0.0, 0.0], 1.0, 0),
+    ([0.0, 0.0, 1.0], 5.0, 2),
+    ([0.0, 0.0, 0.0], 0.0, None),
+    ([], 0.0, None),
+]
+
+WEIGHTS = [
+    # good, bad, seconds since the last answer (None: unknown) -> weight
+    (0, 0, None, UNSEEN_WEIGHT),
+    (0, 0, 0.0, UNSEEN_WEIGHT),
+    (0, 1, 0.0, pytest.approx(2 / 3)),
+    (1, 0, 0.0, pytest.approx(1 / 3)),
+    (100, 1, 0.0, pytest.approx(2 / 103)),
+    (1000, 0, 0.0, MIN_WEIGHT),
+    (3, 3, 0.0, UNSEEN_WEIGHT),
+    # the rate fades back to the prior
+    (100, 1, 100 * RECENCY_SCALE, pytest.approx(UNSEEN_WEIGHT, abs=1e-6)),
+    (0, 5, 100 * RECENCY_SCALE, pytest.approx(UNSEEN_WEIGHT, abs=1e-6)),
+    (2, 0, None, UNSEEN_WEIGHT),
+    # answered in the future (clock change): as if just answered
+    (0, 1, -10.0, pytest.approx(2 / 3)),
+]
+
+
+@pytest.mark.parametrize("weights, value, index", FOUND)
+def test_find(weights, value, index):
+    assert FenwickTree(weights).find(value) == index
+
+
+@pytest.mark.parametrize("weights", [[0.0, 1.0, 0.0, 3.0], [5.0] * 7, [0.0] * 4 + [1.0]])
+def test_draw_follows_the_weights(weights):
+    tree = FenwickTree(weights)
+    rng = random.Random(0)
+    draws = Counter(tree.draw(rng) for _ in range(4000))
+    assert set(draws) == {index for index, weight in enumerate(weights) if weight > 0.0}
+    for index, count in draws.items():
+        assert count / 4000 == pytest.approx(weights[index] / sum(weights), abs=0.05)
+
+
+def test_draw_nothing_left():
+    tree = FenwickTree([1.0, 2.0])
+    tree.update(0, 0.0)
+    tree.update(1, 0.0)
+    assert tree.draw(random.Random(0)) is None
+
+
+def test_update_keeps_the_sums():
+    rng = random.Random(0)
+    weights = [rng.random() for _ in range(37)]
+    tree = FenwickTree(weights)
+    for _ in range(200):
+        index = rng.randrange(len(weights))
+        weights[index] = rng.choice([0.0, rng.random()])
+        tree.update(index, weights[index])
+    for count in range(len(weights) + 1):
+        assert tree.prefix_sum(count) == pytest.approx(sum(weights[:count]))
+
+
+@pytest.mark.parametrize("good, bad, age, weight", WEIGHTS)
+def test_error_weight(good, bad, age, weight):
+    now = 1e9
+    assert error_weight(good, bad, None if age is None else now - age, now) == weight
+
+
+@pytest.mark.parametrize("good, bad", [(100, 1), (10, 0), (5, 4)])
+def test_known_items_never_weigh_more_than_unseen(good, bad):
+    for days in [0, 1, 7, 30]:
+        assert error_weight(good, bad, 0.0, days * RECENCY_SCALE) <= UNSEEN_WEIGHT
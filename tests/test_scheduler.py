@@ -0,0 +1,84 @@
+import pytest
+
+from scheduler import DAY, INITIAL_EASE, MIN_EASE, DueQueue, quality, review
+
+QUALITIES = [
+    # is_ok, ratio, help_used -> grade
+    (True, 1.0, False, 5),
+    (True, 0.9, False, 4),
+    (True, 1.0, True, 3),
+    (True, 0.9, True, 3),
+    (False, 0.5, False, 1),
+    (False, 0.5, True, 1),
+    (False, 0.0, False, 0),
+    (False, None, False, 0),
+]
+
+REVIEWS = [
+    # state, grade -> ease, interval, repetitions, lapses
+    (None, 5, INITIAL_EASE + 0.1, 1.0, 1, 0),
+    (None, 4, INITIAL_EASE, 1.0, 1, 0),
+    (None, 3, INITIAL_EASE - 0.14, 1.0, 1, 0),
+    (None, 1, INITIAL_EASE - 0.54, 1.0, 0, 1),
+    (None, 0, INITIAL_EASE - 0.8, 1.0, 0, 1),
+    ([2.5, 1.0, 1, 0, 0.0], 4, 2.5, 6.0, 2, 0),
+    ([2.5, 6.0, 2, 0, 0.0], 4, 2.5, 15.0, 3, 0),
+    ([2.0, 15.0, 3, 0, 0.0], 5, 2.1, 30.0, 4, 0),
+    # a failure starts the repetitions over
+    ([2.5, 15.0, 3, 1, 0.0], 1, 1.96, 1.0, 0, 2),
+    # the ease never goes below MIN_EASE
+    ([1.4, 1.0, 0, 4, 0.0], 0, MIN_EASE, 1.0, 0, 5),
+]
+
+
+@pytest.mark.parametrize("is_ok, ratio, help_used, grade", QUALITIES)
+def test_quality(is_ok, ratio, help_used, grade):
+    assert quality(is_ok, ratio, help_used) == grade
+
+
+@pytest.mark.parametrize("state, grade, ease, interval, repetitions, lapses", REVIEWS)
+def test_review(state, grade, ease, interval, repetitions, lapses):
+    now = 1000.0
+    assert review(state, grade, now) == [pytest.approx(ease), pytest.approx(interval), repetitions, lapses,
+                                         pytest.approx(now + interval * DAY)]
+
+
+DUE_ORDERS = [
+    # (item, due) added, now -> items popped
+    ([("a", 30.0), ("b", 10.0), ("c", 20.0)], 100.0, ["b", "c", "a"]),
+    ([("a", 30.0), ("b", 10.0), ("c", 20.0)], 20.0, ["b", "c"]),
+    ([("a", 30.0), ("b", 10.0)], 5.0, []),
+    # same due time: in the order they were added
+    ([("a", 10.0), ("b", 10.0), ("c", 10.0)], 10.0, ["a", "b", "c"]),
+    ([], 10.0, []),
+]
+
+
+def pop_all(queue, now):
+    popped = []
+    while (item := queue.pop_due(now)) is not None:
+        popped.append(item)
+    return popped
+
+
+@pytest.mark.parametrize("added, now, popped", DUE_ORDERS)
+def test_due_queue_order(added, now, popped):
+    queue = DueQueue()
+    for item, due in added:
+        queue.add(item, [INITIAL_EASE, 1.0, 1, 0, due])
+    queue.heapify()
+    assert sorted(queue.due_items(now)) == sorted(popped)
+    assert pop_all(queue, now) == popped
+    assert queue.next_due() == min((due for item, due in added if item not in popped), default=None)
+
+
+def test_due_queue_push_and_new_items():
+    queue = DueQueue()
+    for item in ["new1", "new2"]:
+        queue.add(item, None)
+    queue.add("old", [INITIAL_EASE, 1.0, 1, 0, 50.0])
+    queue.heapify()
+    queue.push("failed", [INITIAL_EASE, 1.0, 0, 1, 20.0])
+    assert queue.new_count() == 2
+    assert [queue.pop_new(), queue.pop_new(), queue.pop_new()] == ["new1", "new2", None]
+    assert pop_all(queue, 100.0) == ["failed", "old"]
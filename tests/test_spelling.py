@@ -0,0 +1,56 @@
+import pytest
+
+from spelling import automaton
+
+ACCEPTED = [
+    # shi / si, chi / ti, fu / hu, ji / zi
+    ("すし", "sushi"), ("すし", "susi"),
+    ("ちず", "chizu"), ("ちず", "tizu"),
+    ("ふじ", "fuji"), ("ふじ", "huzi"),
+    # tsu / tu
+    ("つくえ", "tsukue"), ("つくえ", "tukue"),
+    # digraphs
+    ("じゃま", "jama"), ("じゃま", "zyama"), ("じゃま", "jyama"),
+    ("しゃしん", "shashin"), ("しゃしん", "syasin"),
+    # ō / ou / oo / oh / ô
+    ("とうきょう", "tōkyō"), ("とうきょう", "toukyou"), ("とうきょう", "tookyoo"),
+    ("とうきょう", "tohkyoh"), ("とうきょう", "tôkyô"),
+    ("おおきい", "ōkii"), ("おおきい", "ookii"), ("おおきい", "ohkii"),
+    ("コーヒー", "kōhī"), ("コーヒー", "koohii"), ("コーヒー", "kouhii"), ("コーヒー", "ko-hi-"),
+    # n' / nn / m
+    ("きんえん", "kin'en"), ("きんえん", "kinnen"), ("きんえん", "kinen"),
+    ("しんぶん", "shimbun"), ("しんぶん", "shinbun"), ("しんぶん", "shinnbunn"),
+    ("さんぽ", "sampo"), ("さんぽ", "sanpo"),
+    # small tsu: doubled consonant, tch / cch before ch
+    ("きって", "kitte"), ("ざっし", "zasshi"), ("ざっし", "zassi"),
+    ("まっちゃ", "matcha"), ("まっちゃ", "maccha"), ("まっちゃ", "mattya"),
+    ("いっぱい", "ippai"),
+    # case, spaces and several readings
+    ("すし", "SuShi"), ("たべもの", "tabe mono"), ("あした;あす", "asu"), ("あした;あす", "ashita"),
+]
+
+REJECTED = [
+    ("すし", "sushii"), ("すし", "sush"), ("すし", "suzhi"),
+    ("つくえ", "tsukuee"), ("つくえ", "sukue"),
+    ("とうきょう", "tokyo"), ("とうきょう", "tōkyo"),
+    ("おおきい", "okii"),
+    # m only stands for ん before b, m or p
+    ("きんえん", "kimen"), ("かんじ", "kamji"),
+    ("きって", "kite"), ("ざっし", "zashi"),
+    ("まっちゃ", "macha"), ("まっちゃ", "mtcha"),
+    ("あした;あす", "asita2"), ("すし", ""),
+]
+
+
+@pytest.mark.parametrize("kana, response", ACCEPTED)
+def test_accepts(kana, response):
+    assert automaton(kana).accepts(response)
+
+
+@pytest.mark.parametrize("kana, response", REJECTED)
+def test_rejects(kana, response):
+    assert not automaton(kana).accepts(response)
+
+
+def test_no_romaji():
+    assert automaton("漢字") is None
@@ -1,12 +1,30 @@
-import csv
 from abc import ABC, abstractmethod
-from collections import deque
+from collections import defaultdict, deque
 from colorama import init, Back, Fore
-from difflib import SequenceMatcher
 from pathlib import Path
+from typing import Any, Callable, TextIO
 import argparse
-import random, re
 import json
+import random, re
+import time
+
+import instrumentation
+import snapshot
+import spelling
+from events import EVENTS_FILE, EventLog
+from grader import Grader, grade_batch
+from kana import has_kana, has_katakana, kana_to_romaji
+from progress import Journal
+from sampling import FenwickTree, error_weight
+from search import MIN_SCORE, TrigramIndex
+from scheduler import DueQueue, quality, review
+
+PROGRESS_DIR = "progress"
+# Under PROGRESS_DIR, one directory per named profile.
+PROFILES_DIR = "profiles"
+PROFILE_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+# Number of answers a multiple choice question may offer.
+CHOICE_COUNTS = range(2, 10)
 
 init(autoreset=True)
 
@@ -27,47 +45,66 @@ def get_back_color(field: str):
 
 
 class Kanji:
-    def __init__(self, index: int, kanji: str, element):
+    __slots__ = ("index", "kanji", "strokes", "grade", "freq", "jlpt_old", "jlpt_new", "meanings", "radicals")
+
+    def __init__(self, index: int, kanji: str, strokes: int, grade: int | None, freq: int | None,
+                 jlpt_old: int | None, jlpt_new: int | None, meanings: str, radicals: str | None):
         self.index = index
         self.kanji = kanji
-        self.strokes = int(element["strokes"])
-        self.grade = None if element["grade"] is None else int(element["grade"])
-        self.freq = None if element["freq"] is None else int(element["freq"])
-        self.jlpt_old = None if element["jlpt_old"] is None else int(element["jlpt_old"])
-        self.jlpt_new = None if element["jlpt_new"] is None else int(element["jlpt_new"])
-        self.meanings = ";".join(element["meanings"])
-        self.radicals = None if element["wk_radicals"] is None else ";".join(element["wk_radicals"])
-        self.burn_meanings = False
+        self.strokes = strokes
+        self.grade = grade
+        self.freq = freq
+        self.jlpt_old = jlpt_old
+        self.jlpt_new = jlpt_new
+        self.meanings = meanings
+        self.radicals = radicals
+
+    @property
+    def id(self) -> str:
+        return self.kanji
 
     @staticmethod
     def fields() -> list[tuple[str, list[str], list[str]]]:
         return [('meanings', ['kanji'], [])]
 
-    def help(self):
-        print_radicals(self.radicals)
+    def help(self, corpus: "Corpus"):
+        if self.radicals is not None:
+            print_radicals(self.radicals.split(";"))
 
-    def is_help(self):
+    def is_help(self, corpus: "Corpus"):
         return self.meanings
 
     def jlpt(self) -> int:
         return self.jlpt_new
 
+    def __str__(self):
+        return self.kanji
+
+
+KANJI_FIELDS = {field[0] for field in Kanji.fields()}
+
 
 class Word:
-    def __init__(self, index: int, word, kana, romaji, meaning, jlpt_level, kinds, tags, transitivity):
+    __slots__ = ("index", "id", "word", "kana", "romaji", "meaning", "jlpt_level", "kinds", "tags", "transitivity",
+                 "has_katakana", "kanjis", "has_kanji")
+
+    def __init__(self, index: int, id: str, word: str, kana: str, romaji: str, meaning: str, jlpt_level: int,
+                 kinds: tuple[str, ...], tags: tuple[str, ...], transitivity: str | None, has_katakana: bool,
+                 kanjis: tuple[Kanji, ...]):
         self.index = index
+        self.id = id
         self.word = word
         self.kana = kana
         self.romaji = romaji
         self.meaning = meaning
-        self.jlpt_level = int(jlpt_level.replace("JLPT_", ""))
-        self.kinds: list[str] = kinds.split(';')
-        self.tags: list[str] = tags.split(';')
-        self.overlay_meaning = ""
-        self.forbid_meaning = ""
-        self.burn_meaning = False
-        self.burn_romaji = False
-        self.transitivity: str | None = None if transitivity == "" else transitivity
+        self.jlpt_level = jlpt_level
+        self.kinds: tuple[str, ...] = kinds
+        self.tags: tuple[str, ...] = tags
+        self.transitivity: str | None = transitivity
+        self.has_katakana = has_katakana
+        # Kanji of the word found in kanji.json, resolved once at load.
+        self.kanjis = kanjis
+        self.has_kanji = len(kanjis) != 0
 
     @staticmethod
     def fields() -> list[tuple[str, list[str], list[str]]]:
@@ -78,18 +115,12 @@ class Word:
                 ('romaji', ['word'], ['meaning']),
                 ('romaji', ['meaning'], ['word'])]
 
-    def help(self):
-        for kanji in list_kanji(self.word):
+    def help(self, corpus: "Corpus"):
+        for kanji in self.kanjis:
             print(f"\t{kanji.kanji} : {kanji.meanings}")
 
-    def is_help(self) -> bool:
-        for letter in self.word:
-            if letter in kanjis:
-                if len(self.word) > 1:
-                    return True
-                else:
-                    return False
-        return False
+    def is_help(self, corpus: "Corpus") -> bool:
+        return self.has_kanji and len(self.word) > 1
 
     def jlpt(self) -> int:
         return self.jlpt_level
@@ -98,31 +129,402 @@ class Word:
         return self.word
 
 
+def load_kanji(root: Path = Path(".")) -> dict[str, Kanji]:
+    columns = snapshot.load("kanji", root)
+    rows = zip(columns["kanji"], columns["strokes"], columns["grade"], columns["freq"],
+               columns["jlpt_old"], columns["jlpt_new"], columns["meanings"], columns["radicals"])
+    return {row[0]: Kanji(index, *row) for index, row in enumerate(rows)}
+
+
+def load_words(kanjis: dict[str, Kanji], root: Path = Path(".")) -> list[Word]:
+    columns = snapshot.load("words", root)
+    rows = zip(columns["id"], columns["word"], columns["kana"], columns["romaji"], columns["meaning"],
+               columns["jlpt_level"], columns["kinds"], columns["tags"], columns["transitivity"],
+               columns["has_katakana"])
+    return [Word(index, *row, tuple(kanjis[letter] for letter in row[1] if letter in kanjis))
+            for index, row in enumerate(rows)]
+
+
+# Item fields indexed for search(), besides the added meanings.
+SEARCH_FIELDS = {"kanji": ["kanji", "meanings"], "word": ["word", "meaning", "kana", "romaji"]}
+# Search score from which an added meaning is reported as already used by another item.
+SAME_MEANING_SCORE = 0.8
+
+
+def _is_affix(word: Word) -> bool:
+    """word is a prefix or suffix entry (〜側, お〜...)."""
+    return any(mark in word.word or mark in word.kana for mark in "～〜~")
+
+
+def _search_texts(text: str) -> list[str]:
+    """The meanings of text, as the grader sees them: without the parenthesized notes, split on ';'."""
+    return [part.strip() for part in re.sub(r'\s*\(.*?\)\s*', ' ', text).split(";") if part.strip()]
+
+
+class WordIndex:
+    """Word indexes by JLPT level, part of speech and tag, so a
+    session is selected with set operations instead of a scan of every word."""
+
+    def __init__(self, words: list[Word]):
+        self.by_level: dict[int, set[int]] = defaultdict(set)
+        self.by_level_kind: dict[tuple[int, str], set[int]] = defaultdict(set)
+        self.by_level_tag: dict[tuple[int, str], set[int]] = defaultdict(set)
+        for word in words:
+            level = word.jlpt()
+            self.by_level[level].add(word.index)
+            for kind in word.kinds:
+                self.by_level_kind[(level, kind)].add(word.index)
+            for tag in word.tags:
+                self.by_level_tag[(level, tag)].add(word.index)
+
+    def find(self, jlpt_levels: list[int] | None = None, kind: str | None = None,
+             tag: str | None = None) -> set[int]:
+        levels = self.by_level.keys() if jlpt_levels is None else jlpt_levels
+        if tag is not None:
+            found = set().union(*(self.by_level_tag.get((level, tag), ()) for level in levels))
+            if kind is not None:
+                found &= set().union(*(self.by_level_kind.get((level, kind), ()) for level in levels))
+            return found
+        if kind is not None:
+            return set().union(*(self.by_level_kind.get((level, kind), ()) for level in levels))
+        return set().union(*(self.by_level.get(level, ()) for level in levels))
+
+
+class KanjiIndex:
+    def __init__(self, kanjis: dict[str, Kanji]):
+        self.by_level: dict[int | None, list[Kanji]] = defaultdict(list)
+        for kanji in kanjis.values():
+            self.by_level[kanji.jlpt()].append(kanji)
+
+    def find(self, jlpt_levels: list[int] | None = None) -> list[Kanji]:
+        levels = self.by_level.keys() if jlpt_levels is None else jlpt_levels
+        return sorted((kanji for level in levels for kanji in self.by_level.get(level, ())),
+                      key=lambda kanji: kanji.index)
+
+
+class SharedCorpus:
+    """Words and kanji found in root, and everything derived from them only
+    (indexes, search index, distractors, graders of the items without
+    overlays): read-only once built, loaded once per process and shared by
+    the Corpus of every progress profile.
+
+    Each part is loaded the first time it is used, so a tool that only
+    needs kanji never parses the word list."""
+
+    def __init__(self, root: Path = Path(".")):
+        self.root = Path(root)
+        self._kanjis: dict[str, Kanji] | None = None
+        self._words: list[Word] | None = None
+        self._words_by_id: dict[str, Word] | None = None
+        self._legacy_word_ids: dict[str, str] | None = None
+        self._word_index: WordIndex | None = None
+        self._kanji_index: KanjiIndex | None = None
+        self._search_index: TrigramIndex | None = None
+        self._neighbours: list[tuple[int, ...]] | None = None
+        # Graders of the items without added or forbidden meanings, by (item id, field).
+        self.graders: dict[tuple[str, str], Grader] = {}
+
+    @property
+    def kanjis(self) -> dict[str, Kanji]:
+        if self._kanjis is None:
+            with instrumentation.phase("load_kanji"):
+                self._kanjis = load_kanji(self.root)
+        return self._kanjis
+
+    @property
+    def words(self) -> list[Word]:
+        if self._words is None:
+            kanjis = self.kanjis
+            with instrumentation.phase("load_words"):
+                self._words = load_words(kanjis, self.root)
+        return self._words
+
+    @property
+    def words_by_id(self) -> dict[str, Word]:
+        if self._words_by_id is None:
+            self._words_by_id = {word.id: word for word in self.words}
+        return self._words_by_id
+
+    def item(self, item_id: str) -> Kanji | Word | None:
+        """Word or kanji with this id (or the id of a word up to version 4
+        of the snapshot, as in answer events recorded then)."""
+        word = self.words_by_id.get(item_id)
+        if word is not None:
+            return word
+        kanji = self.kanjis.get(item_id)
+        if kanji is not None:
+            return kanji
+        return self.words_by_id.get(self.legacy_word_ids([item_id]).get(item_id))
+
+    def legacy_word_ids(self, keys) -> dict[str, str]:
+        """Current id of each of keys that is not the id of a word but was up
+        to version 4 of the snapshot, when word ids hashed the meaning too."""
+        unknown = [key for key in keys if key not in self.words_by_id]
+        if not unknown:
+            return {}
+        if self._legacy_word_ids is None:
+            words = self.words
+            legacy_ids = snapshot.unique_ids(snapshot.legacy_word_id(word.word, word.kana, word.meaning)
+                                             for word in words)
+            self._legacy_word_ids = {legacy_id: word.id for legacy_id, word in zip(legacy_ids, words)}
+        return {key: self._legacy_word_ids[key] for key in unknown if key in self._legacy_word_ids}
+
+    @property
+    def word_index(self) -> WordIndex:
+        if self._word_index is None:
+            words = self.words
+            with instrumentation.phase("index_words"):
+                self._word_index = WordIndex(words)
+        return self._word_index
+
+    @property
+    def kanji_index(self) -> KanjiIndex:
+        if self._kanji_index is None:
+            kanjis = self.kanjis
+            with instrumentation.phase("index_kanji"):
+                self._kanji_index = KanjiIndex(kanjis)
+        return self._kanji_index
+
+    @property
+    def search_index(self) -> TrigramIndex:
+        """Trigram index of the words (writing, meaning, kana, romaji) and
+        the kanji (character, meanings), keyed by item id and labelled with
+        the field they come from."""
+        if self._search_index is None:
+            kanjis, words = self.kanjis, self.words
+            with instrumentation.phase("index_search"):
+                index = TrigramIndex()
+                for items, fields in [(kanjis.values(), SEARCH_FIELDS["kanji"]), (words, SEARCH_FIELDS["word"])]:
+                    for item in items:
+                        for field_name in fields:
+                            for text in _search_texts(getattr(item, field_name)):
+                                index.add(item.id, text, field_name)
+                self._search_index = index
+        return self._search_index
+
+    @property
+    def neighbours(self) -> list[tuple[int, ...]]:
+        """Indexes of the distractors of every word (see distractors()),
+        loaded on first use; building them needs NumPy."""
+        if self._neighbours is None:
+            with instrumentation.phase("load_distractors"):
+                self._neighbours = snapshot.load("distractors", self.root)["neighbours"]
+        return self._neighbours
+
+    def distractors(self, word: Word) -> list[Word]:
+        """Words close to word (same JLPT level, close meaning, kanji, kana or
+        part of speech), nearest first; precomputed when the snapshot is
+        built."""
+        words = self.words
+        return [words[index] for index in self.neighbours[word.index]]
+
+
+class Corpus:
+    """The words and kanji of a SharedCorpus, seen through the progress of
+    one profile (burns, added and forbidden meanings, results, schedule,
+    answer events).
+
+    The default profile keeps its progress in root/progress, as it always
+    did; a named profile in root/progress/profiles/<name>. A profile only
+    holds its own journals, loaded the first time they are used, and the
+    graders and search documents of the items it added meanings to: the
+    words, kanji and everything derived from them alone are shared, so
+    profile() costs a few small objects.
+
+    layers: progress journals already loaded by another process (name ->
+    entries, see loaded_layers()), used read only instead of the files."""
+
+    def __init__(self, root: Path = Path("."), profile: str | None = None, shared: SharedCorpus | None = None,
+                 layers: dict[str, dict] | None = None):
+        if profile is not None and not PROFILE_PATTERN.fullmatch(profile):
+            raise ValueError(f"Invalid profile name: {profile!r} (letters, digits, '_' and '-', up to 64)")
+        self.shared = shared if shared is not None else SharedCorpus(root)
+        self.root = self.shared.root
+        self.profile_name = profile
+        self.progress_dir = self.root / PROGRESS_DIR if profile is None else \
+            self.root / PROGRESS_DIR / PROFILES_DIR / profile
+        self._overlay_index: TrigramIndex | None = None
+        self._overlay_documents: dict[tuple[str, str], list[int]] = {}
+        # Graders of the items with added or forbidden meanings in this profile.
+        self._graders: dict[tuple[str, str], Grader] = {}
+        self._layers: dict[str, Journal] = {name: Journal(self.progress_dir / (name + ".journal"), entries=entries)
+                                            for name, entries in (layers or {}).items()}
+        self._events: EventLog | None = None
+
+    def profile(self, name: str | None) -> "Corpus":
+        """The same words and kanji, with the progress of profile name
+        (None for the default profile)."""
+        return Corpus(self.root, name, self.shared)
+
+    def loaded_layers(self) -> dict[str, dict]:
+        """Entries of the progress journals loaded so far, by name."""
+        return {name: journal.entries for name, journal in self._layers.items()}
+
+    def close(self) -> None:
+        """Close the files of this profile's journals (they are reopened when written)."""
+        for journal in self._layers.values():
+            journal.close()
+        if self._events is not None:
+            self._events.close()
+
+    @property
+    def kanjis(self) -> dict[str, Kanji]:
+        return self.shared.kanjis
+
+    @property
+    def words(self) -> list[Word]:
+        return self.shared.words
+
+    def item(self, item_id: str) -> Kanji | Word | None:
+        """Word or kanji with this id."""
+        return self.shared.item(item_id)
+
+    @property
+    def word_index(self) -> WordIndex:
+        return self.shared.word_index
+
+    @property
+    def kanji_index(self) -> KanjiIndex:
+        return self.shared.kanji_index
+
+    @property
+    def search_index(self) -> TrigramIndex:
+        return self.shared.search_index
+
+    def distractors(self, word: Word) -> list[Word]:
+        return self.shared.distractors(word)
+
+    @property
+    def overlay_index(self) -> TrigramIndex:
+        """Trigram index of the meanings added in this profile, labelled
+        "added <field>"; searched together with the shared search_index."""
+        if self._overlay_index is None:
+            self._overlay_index = TrigramIndex()
+            for field_name in {field[0] for field in Kanji.fields() + Word.fields()}:
+                for item_id in self.overlay("response", field_name).entries:
+                    self._index_overlay(field_name, item_id)
+        return self._overlay_index
+
+    def _index_overlay(self, field_name: str, item_id: str) -> None:
+        documents = self._overlay_documents.pop((item_id, field_name), [])
+        for document in documents:
+            self._overlay_index.remove(document)
+        texts = _search_texts(self.overlay("response", field_name).get(item_id, ""))
+        documents = [self._overlay_index.add(item_id, text, "added " + field_name) for text in texts]
+        self._overlay_documents[(item_id, field_name)] = [document for document in documents if document is not None]
+
+    def search(self, query: str, limit: int = 10,
+               min_score: float = MIN_SCORE) -> list[tuple[float, Kanji | Word, str, str]]:
+        """Fuzzy matches of query, one per item, best first: (score, item,
+        source, matched text), the source being the field or "added <field>"."""
+        best = {}
+        for match in self.search_index.search(query, limit, min_score) + \
+                self.overlay_index.search(query, limit, min_score):
+            if match[1] not in best or match[0] > best[match[1]][0]:
+                best[match[1]] = match
+        ranked = sorted(best.values(), key=lambda match: match[0], reverse=True)[:limit]
+        return [(score, self.item(item_id), source, text) for score, item_id, source, text in ranked]
+
+    def layer(self, name: str, field_name: str, parse_legacy: Callable[[str], Any] = str) -> Journal:
+        """Progress journal called name, keyed by the id of the items asked
+        field_name. For the default profile, the legacy name.txt file is
+        imported on first use."""
+        if name not in self._layers:
+            legacy = self.root / (name + ".txt") if self.profile_name is None else None
+            with instrumentation.phase("load_progress"):
+                journal = Journal(self.progress_dir / (name + ".journal"), legacy, parse_legacy)
+            if any(isinstance(key, int) for key in journal.entries):
+                # Written when progress was keyed by row position: move to ids once.
+                items = list(self.kanjis.values()) if field_name in KANJI_FIELDS else self.words
+                journal.rekey(lambda key: key if not isinstance(key, int)
+                              else items[key].id if key < len(items) else None)
+            elif field_name not in KANJI_FIELDS:
+                legacy_ids = self.shared.legacy_word_ids(journal.entries)
+                if legacy_ids:
+                    # Written when word ids hashed the meaning too: move to the current ids once.
+                    journal.rekey(lambda key: legacy_ids.get(key, key))
+            self._layers[name] = journal
+        return self._layers[name]
+
+    def overlay(self, kind: str, field_name: str) -> Journal:
+        """Meanings added ('response') or forbidden ('forbid') for field_name, by item id."""
+        return self.layer("overlay_" + kind + "_" + field_name, field_name)
+
+    def add_overlay(self, kind: str, field_name: str, item: Kanji | Word, text: str) -> None:
+        self.overlay(kind, field_name).update(item.id, lambda current: current + ";" + text if current else text, "")
+        self._graders.pop((item.id, field_name), None)
+        if kind == "response" and self._overlay_index is not None:
+            self._index_overlay(field_name, item.id)
+
+    def grader(self, item: Kanji | Word, field_name: str) -> Grader:
+        """Grader of the solutions of item for field_name, overlays included.
+        Compiled on first use and shared by every question on the item: by
+        every profile when none of them added or forbade a meaning, else by
+        the questions of this profile only. add_overlay() drops it, so only
+        the edited item is compiled again."""
+        key = (item.id, field_name)
+        overlay = self.overlay("response", field_name).get(item.id, "")
+        forbid = self.overlay("forbid", field_name).get(item.id, "")
+        graders = self._graders if overlay or forbid else self.shared.graders
+        grader = graders.get(key)
+        if grader is None:
+            solutions = re.sub(r'\s*\(.*?\)\s*', '', getattr(item, field_name)).split(";")
+            should_be_exact = field_name == "romaji"
+            variants = spelling.automaton(item.kana) if should_be_exact and isinstance(item, Word) else None
+            grader = Grader(solutions + overlay.split(";"), forbid.split(";"), should_be_exact, variants=variants)
+            graders[key] = grader
+        return grader
+
+    def burns(self, field_name: str) -> Journal:
+        return self.layer("burn_" + field_name, field_name, _parse_legacy_burn)
+
+    def is_burned(self, item: Kanji | Word, field_name: str) -> bool:
+        return self.burns(field_name).get(item.id, False)
+
+    def set_burn(self, item: Kanji | Word, field_name: str, burned: bool) -> None:
+        if burned:
+            self.burns(field_name).set(item.id, True)
+        else:
+            self.burns(field_name).delete(item.id)
+
+    def results(self, field_name: str) -> Journal:
+        """Number of correct answers, by item id."""
+        return self.layer("word_result_" + field_name, field_name, _parse_legacy_result)
+
+    def errors(self, field_name: str) -> Journal:
+        """Number of wrong answers, by item id."""
+        return self.layer("word_error_" + field_name, field_name)
+
+    def last_answers(self, field_name: str) -> Journal:
+        """Time of the last answer (epoch seconds), by item id."""
+        return self.layer("last_answer_" + field_name, field_name)
+
+    def schedule(self, field_name: str) -> Journal:
+        """Spaced repetition state (see scheduler.py), by item id."""
+        return self.layer("schedule_" + field_name, field_name)
+
+    @property
+    def events(self) -> EventLog:
+        """Every graded answer (see events.py)."""
+        if self._events is None:
+            self._events = EventLog(self.progress_dir / EVENTS_FILE)
+        return self._events
+
+
 class Question:
-    def __init__(self, item: Kanji | Word, selected_field: tuple[str, list[str], list[str]] | None):
+    __slots__ = ("corpus", "item", "field", "choices")
+
+    def __init__(self, corpus: Corpus, item: Kanji | Word,
+                 selected_field: tuple[str, list[str], list[str]] | None = None):
+        self.corpus = corpus
         self.item = item
         self.field = None
-        self._burn = {}
-        self.overlay_meaning = {}
-        self.forbid_meaning = {}
-        if isinstance(item, Word):
-            self._burn['meaning__word_kana'] = item.burn_meaning
-            self._burn['romaji__word'] = item.burn_romaji
-            self._burn['romaji__meaning'] = item.burn_romaji
-            self.overlay_meaning['meaning__word_kana'] = item.overlay_meaning
-            self.overlay_meaning['romaji__word'] = ""
-            self.overlay_meaning['romaji__meaning'] = ""
-            self.forbid_meaning['meaning__word_kana'] = item.forbid_meaning
-            self.forbid_meaning['romaji__word'] = ""
-            self.forbid_meaning['romaji__meaning'] = ""
-        if isinstance(item, Kanji):
-            self._burn['meanings__kanji'] = item.burn_meanings
-            self.overlay_meaning['meanings__kanji'] = ""
-            self.forbid_meaning['meanings__kanji'] = ""
+        # Items whose field is offered as the answers of a multiple choice question.
+        self.choices: list[Kanji | Word] | None = None
         fields = [selected_field] if selected_field is not None else item.fields()
         for field in fields:
             field_name = field[0]
-            if self._burn[field_name + "__" + "_".join(field[1])]:
+            if corpus.is_burned(item, field_name):
                 continue
             if self.is_questionnable(item, field_name):
                 self.field = field
@@ -132,72 +534,114 @@ class Question:
     def is_questionnable(self, item: Kanji | Word, field_name: str) -> bool:
         if isinstance(item, Word):
             if field_name == 'meaning':
-                if self._burn['meaning__word_kana']:
-                    if len(list_kanji(item.word)) == 0:
+                if self.corpus.is_burned(item, 'meaning'):
+                    if not item.has_kanji:
                         # No Kanji in this word. No reason to ask romaji.
                         return False
-            if is_katakana_present(item.word):
+            if item.has_katakana:
                 # No ask romaji for katakana word.
                 return False
-            if field_name == 'romaji' and not is_kanji_present(item.word):
+            if field_name == 'romaji' and not item.has_kanji:
                 # No ask romaji for kana word.
                 return False
             return True
         else:
             if field_name == 'meanings':
-                if self._burn['meanings__kanji']:
+                if self.corpus.is_burned(item, 'meanings'):
                     return False
             return True
 
+    @staticmethod
+    def askable_words(corpus: Corpus, field_name: str, indexes: set[int]) -> set[int]:
+        """Indexes among indexes of the words that can be asked field_name:
+        the burn check and is_questionnable() applied to a whole selection."""
+        burned = corpus.burns(field_name)
+        words = corpus.words
+        needs_kanji = field_name == 'romaji'
+        return {index for index in indexes
+                if words[index].id not in burned and not words[index].has_katakana
+                and (words[index].has_kanji or not needs_kanji)}
+
     def ask(self, prefix: str):
         print(f"{prefix} {', '.join([getattr(self.item, field) for field in self.field[1]])} : {get_back_color(self.field[0])}{self.field[0]}{Back.RESET} ?")
-
-    def burn(self):
-        index = self.item.index
-        _add_entry_file(index, "o", "burn_" + self.field[0] + ".txt")
-        print(f"The word '{getattr(self.item, self.field[0])}' has been burned.")
-        self._burn[self.field[0] + '__' + '_'.join(self.field[1])] = True
-
-    def unburn(self):
-        index = self.item.index
-        _add_entry_file(index, "", "burn_" + self.field[0] + ".txt")
-        print(f"The word '{getattr(self.item, self.field[0])}' has been unburned.")
-        self._burn[self.field[0] + '__' + '_'.join(self.field[1])] = False
-
-    def reset(self):
+        for number, choice in enumerate(self.choices or [], start=1):
+            print(f"\t{number}. {getattr(choice, self.field[0])}")
+
+    def draw_choices(self, count: int, rng: random.Random) -> list[Kanji | Word] | None:
+        """The item and count - 1 of its distractors, shuffled: the answers
+        offered by a multiple choice question (None for a kanji, or when
+        there are not enough distractors). A distractor that is also a
+        solution of the question (same meaning, homophone...), that reads
+        like an answer already offered, that could not be asked the field
+        itself (katakana words for romaji...) or that is an affix when the
+        item is not, is never offered: it would be ruled out at a glance."""
+        if not isinstance(self.item, Word):
+            return None
+        grader = self.grader()
+        field_name = self.field[0]
+        answer = getattr(self.item, field_name)
+        affix = _is_affix(self.item)
+        candidates = self.corpus.distractors(self.item)
+        rng.shuffle(candidates)
+        choices = [self.item]
+        texts = {answer}
+        for word in candidates:
+            text = getattr(word, field_name)
+            if text not in texts and _is_affix(word) == affix and self.is_questionnable(word, field_name) \
+                    and not any(grader.is_solution(part) for part in _search_texts(text)):
+                choices.append(word)
+                texts.add(text)
+                if len(choices) == count:
+                    rng.shuffle(choices)
+                    return choices
+        return None
+
+    def burn(self) -> str:
+        self.corpus.set_burn(self.item, self.field[0], True)
+        return f"The word '{getattr(self.item, self.field[0])}' has been burned."
+
+    def unburn(self) -> str:
+        self.corpus.set_burn(self.item, self.field[0], False)
+        return f"The word '{getattr(self.item, self.field[0])}' has been unburned."
+
+    def reset(self) -> str:
         for field in self.item.fields():
-            _add_entry_file(index, "", "burn_" + field[0] + ".txt")
-            self._burn[field[0] + '__' + '_'.join(field[1])] = False
-        print(f"The word '{getattr(self.item, field[0])}' has been reset.")
+            self.corpus.set_burn(self.item, field[0], False)
+        return f"The word '{getattr(self.item, self.field[0])}' has been reset."
 
     def help(self):
-        self.item.help()
+        self.item.help(self.corpus)
 
     def is_help(self) -> bool:
-        return self.item.is_help()
+        return self.item.is_help(self.corpus)
 
     def jlpt(self) -> str:
         return self.item.jlpt()
 
-    def add_forbid(self, forbid: str):
-        index = self.item.index
-        _add_entry_file(index, forbid, "overlay_forbid_" + self.field[0] + ".txt")
-        print(f"Add forbidden meaning '{forbid}' to the word '{words[index].word},{words[index].kana}'")
+    def add_forbid(self, forbid: str) -> str:
+        self.corpus.add_overlay("forbid", self.field[0], self.item, forbid)
+        return f"Add forbidden meaning '{forbid}' to the word '{self.item}'"
 
-    def add_meaning(self, meaning: str):
-        index = self.item.index
-        _add_entry_file(index, meaning, "overlay_response_" + self.field[0] + ".txt")
-        print(f"Add new meaning '{meaning}' to the word '{words[index].word},{words[index].kana}'")
+    def add_meaning(self, meaning: str) -> str:
+        others = [item for _, item, _, _ in self.corpus.search(meaning, limit=5, min_score=SAME_MEANING_SCORE)
+                  if item is not self.item]
+        self.corpus.add_overlay("response", self.field[0], self.item, meaning)
+        message = f"Add new meaning '{meaning}' to the word '{self.item}'"
+        if others:
+            message += f"\n'{meaning}' is close to a meaning of: {', '.join(str(item) for item in others)}"
+        return message
 
     def print_word_details(self):
         if not isinstance(self.item, Word):
             return
 
+        overlay_meaning = self.corpus.overlay("response", "meaning").get(self.item.id, "")
+        forbid_meaning = self.corpus.overlay("forbid", "meaning").get(self.item.id, "")
         overlay_meanings = "; ".join(
-            meaning.strip() for meaning in self.item.overlay_meaning.split(";") if meaning.strip()
+            meaning.strip() for meaning in overlay_meaning.split(";") if meaning.strip()
         )
         forbidden_meanings = "; ".join(
-            meaning.strip() for meaning in self.item.forbid_meaning.split(";") if meaning.strip()
+            meaning.strip() for meaning in forbid_meaning.split(";") if meaning.strip()
         )
         kinds = ", ".join(kind for kind in self.item.kinds if kind) or "not specified"
 
@@ -212,7 +656,7 @@ class Question:
         print(f"\tTypes: {kinds}")
         if self.item.transitivity:
             print(f"\tTransitivity: {self.item.transitivity}")
-        contained_kanji = list_kanji(self.item.word)
+        contained_kanji = self.item.kanjis
         if contained_kanji:
             print("\tKanji:")
             for kanji in contained_kanji:
@@ -229,70 +673,265 @@ class Question:
         self.print_word_details()
 
     def save_result(self, flag: bool, ) -> None:
+        self.corpus.last_answers(self.field[0]).set(self.item.id, time.time())
         if not flag:
+            self.corpus.errors(self.field[0]).update(self.item.id, lambda count: count + 1, 0)
             return
 
-        path = Path("word_result_meaning.txt")
-        lines = []
+        self.corpus.results(self.field[0]).update(self.item.id, lambda count: count + 1, 0)
 
-        if path.exists():
-            with path.open("r", encoding="utf-8") as f:
-                lines = [line.strip() for line in f.readlines()]
-
-        while len(lines) <= self.item.index:
-            lines.append("0")
-
-        try:
-            value = int(lines[self.item.index])
-        except ValueError:
-            value = 0
-        lines[self.item.index] = str(value + 1)
-
-        with path.open("w", encoding="utf-8") as f:
-            for line in lines:
-                f.write(line + "\n")
+    def error_weight(self, now: float) -> float:
+        """Weight of this question in an error-weighted draw (see sampling.py)."""
+        field_name = self.field[0]
+        return error_weight(self.corpus.results(field_name).get(self.item.id, 0),
+                            self.corpus.errors(field_name).get(self.item.id, 0),
+                            self.corpus.last_answers(field_name).get(self.item.id), now)
 
     def check_solution(self, response: str) -> (bool, float | None):
         if not response:
             return False, None
-        solutions = re.sub(r'\s*\(.*?\)\s*', '', getattr(self.item, self.field[0])).split(";")
-        solutions = solutions + self.overlay_meaning[self.field[0] + '__' + '_'.join(self.field[1])].split(";")
-        forbids = self.forbid_meaning[self.field[0] + '__' + '_'.join(self.field[1])].split(";")
-        should_be_exact = self.field[0] == "romaji"
-        return check_field(response, solutions, forbids, should_be_exact)
+        if self.choices is not None and response.strip().isdecimal():
+            number = int(response)
+            if 1 <= number <= len(self.choices):
+                return (True, 1.0) if self.choices[number - 1] is self.item else (False, 0.0)
+        return self.grader().grade(self.transliterate(response))
+
+    def transliterate(self, response: str) -> str:
+        """Kana typed for a romaji question, graded as its Hepburn romaji."""
+        if self.field[0] == "romaji" and has_kana(response):
+            return kana_to_romaji(response)
+        return response
+
+    def grader(self) -> Grader:
+        return self.corpus.grader(self.item, self.field[0])
+
+
+def _build_command_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(add_help=False, exit_on_error=False)
+    parser.add_argument('-f', type=str, nargs="+", help="Forbid a description of sentence from a solution.")
+    parser.add_argument('-a', type=str, nargs="+", help="Add a description of sentence for a solution.")
+    parser.add_argument('-b', action='store_true', help="Burn the last question.")
+    parser.add_argument('-u', action='store_true', help="Unburn the last question.")
+    parser.add_argument('-r', action='store_true', help="Reset the last question.")
+    parser.add_argument('-s', action='store_true', help="Stop the session.")
+    parser.add_argument('-q', type=str, nargs="+", help="Search the words and kanji (meanings, kana, romaji...).")
+    return parser
+
+
+COMMAND_PARSER = _build_command_parser()
+
+
+class Answer:
+    """Outcome of Session.submit().
+
+    graded is False when the response only asked for help (an empty answer
+    to a question with help): the same question is still waiting."""
+
+    __slots__ = ("question", "response", "is_ok", "ratio", "graded", "help_used")
+
+    def __init__(self, question: Question, response: str, is_ok: bool, ratio: float | None,
+                 graded: bool, help_used: bool):
+        self.question = question
+        self.response = response
+        self.is_ok = is_ok
+        self.ratio = ratio
+        self.graded = graded
+        self.help_used = help_used
 
 
 class Session(ABC):
-    def __init__(self):
+    """Quiz state machine, free of any input/output.
+
+    A front end calls start(), then loops on next_question() and feeds
+    what the learner typed to command() (burn, add meaning... returns a
+    message, or None when the text is not a command) or submit()."""
+
+    BLOCK_SIZE = 15
+    USES_BLOCKS = True
+
+    def __init__(self, corpus: Corpus):
+        self.corpus = corpus
         self.last_question = None
         self.questions_word = []
         self.questions_kanji = []
-        self._build_questions()
-        self._choose_questions_word_block()
-        random.shuffle(self.questions_word)
-        random.shuffle(self.questions_kanji)
-        self.questions_word_length_initial = len(self.questions_word)
-        self.questions_kanji_length_initial = len(self.questions_kanji)
-        self.questions_length_initial = self.questions_word_length_initial + self.questions_kanji_length_initial
+        with instrumentation.phase("build_questions"):
+            self._build_questions()
+        self.questions_word_length_initial = 0
+        self.questions_kanji_length_initial = 0
+        self.questions_length_initial = 0
         self._pending_questions_word = 0
         self._pending_questions_kanji = 0
+        self._subgroup = deque()
+        self._subgroup_size = 4
+        self._next_question_number = 1
+        self.current: tuple[Question, int] | None = None
+        self.help_shown = False
+        # When the current question was shown (time.monotonic()).
+        self._shown_at: float | None = None
+        self.stopped = False
+        self.random = random.Random()
         self.good_answer = 0
         self.bad_answer = 0
         self.score = 0.0
         self.failed_questions = {}
+        # Number of answers offered by multiple choice word questions, None for free text.
+        self.choice_count: int | None = None
 
     @abstractmethod
     def _build_questions(self) -> None:
         """Populate self.questions_word and self.questions_kanji."""
 
-    def _choose_questions_word_block(self, block_size: int = 15) -> None:
-        if len(self.questions_word) <= block_size:
-            return
+    def _build_word_questions(self, indexes: set[int], word_field) -> None:
+        fields = [word_field] if word_field is not None else Word.fields()
+        askable = set().union(*(Question.askable_words(self.corpus, field[0], indexes) for field in fields))
+        words = self.corpus.words
+        self.questions_word = [Question(self.corpus, words[index], word_field) for index in sorted(askable)]
+
+    def word_block_count(self, block_size: int = BLOCK_SIZE) -> int:
+        """Number of blocks the word questions are split into (0 or 1: no choice to make)."""
+        return (len(self.questions_word) + block_size - 1) // block_size
+
+    def start(self, block: int | None = None, block_size: int = BLOCK_SIZE, subgroup_size: int = 4,
+              seed: int | None = None) -> None:
+        """Keep only the 1-based block of word questions (all of them when
+        None) and shuffle them. Up to subgroup_size questions are in
+        rotation at once; they are queued on the first next_question().
+        The same seed gives the same question order."""
+        if seed is not None:
+            self.random.seed(seed)
+        if subgroup_size < 1:
+            raise ValueError("subgroup_size must be greater than zero")
+        if block is not None:
+            if not 1 <= block <= max(self.word_block_count(block_size), 1):
+                raise ValueError(f"block must be between 1 and {self.word_block_count(block_size)}")
+            start = (block - 1) * block_size
+            self.questions_word = self.questions_word[start:start + block_size]
+        self.random.shuffle(self.questions_word)
+        self.random.shuffle(self.questions_kanji)
+        self.questions_word_length_initial = len(self.questions_word)
+        self.questions_kanji_length_initial = len(self.questions_kanji)
+        self.questions_length_initial = self.questions_word_length_initial + self.questions_kanji_length_initial
+        self._subgroup_size = subgroup_size
+
+    def _append_next_question(self) -> bool:
+        if not self.questions_word and not self.questions_kanji:
+            return False
+
+        index = self.random.randint(0, len(self.questions_word) + len(self.questions_kanji) - 1)
+        if index < len(self.questions_word):
+            self._subgroup.append((self.questions_word.pop(), False, self._next_question_number))
+            self._pending_questions_word += 1
+        else:
+            self._subgroup.append((self.questions_kanji.pop(), False, self._next_question_number))
+            self._pending_questions_kanji += 1
+        self._next_question_number += 1
+        return True
+
+    def next_question(self) -> Question | None:
+        """Question waiting for an answer, or None when the session is over."""
+        if self.current is not None:
+            return self.current[0]
+        if self._next_question_number == 1:
+            while len(self._subgroup) < self._subgroup_size and self._append_next_question():
+                pass
+        if self.stopped or not self._subgroup:
+            return None
+        question, is_retry, question_number = self._subgroup.popleft()
+        if not is_retry:
+            if isinstance(question.item, Word):
+                self._pending_questions_word -= 1
+            else:
+                self._pending_questions_kanji -= 1
+        self.current = (question, question_number)
+        self.help_shown = False
+        self._shown_at = time.monotonic()
+        instrumentation.begin_turn(question_number)
+        if self.choice_count is not None:
+            with instrumentation.phase("choices"):
+                question.choices = question.draw_choices(self.choice_count, self.random)
+        return question
+
+    def remaining(self) -> tuple[int, int]:
+        """Kanji and word questions not answered correctly yet."""
+        return (len(self.questions_kanji) + self._pending_questions_kanji,
+                len(self.questions_word) + self._pending_questions_word)
+
+    def command(self, text: str) -> str | None:
+        with instrumentation.phase("command"):
+            return self._command(text)
+
+    def _command(self, text: str) -> str | None:
+        try:
+            args, unknown = COMMAND_PARSER.parse_known_args(text.split())
+        except argparse.ArgumentError as error:
+            return str(error)
+        if args.s:
+            self.stopped = True
+            self.current = None
+            return "Session stopped."
+        if args.q is not None:
+            return format_matches(self.corpus.search(' '.join(args.q)))
+        if args.f is None and args.a is None and not (args.b or args.u or args.r):
+            return None
+        if self.last_question is None:
+            return "No previous word"
+        if args.f is not None:
+            return self.last_question.add_forbid(' '.join(args.f))
+        if args.a is not None:
+            return self.last_question.add_meaning(' '.join(args.a))
+        if args.b:
+            return self.last_question.burn()
+        if args.u:
+            return self.last_question.unburn()
+        return self.last_question.reset()
+
+    def submit(self, response: str) -> Answer:
+        if self.next_question() is None:
+            raise ValueError("No question waiting for an answer")
+        question, question_number = self.current
+        if response == "" and not self.help_shown and question.is_help():
+            self.help_shown = True
+            return Answer(question, response, False, None, graded=False, help_used=True)
+
+        with instrumentation.phase("grade"):
+            is_ok, ratio = question.check_solution(response)
+        with instrumentation.phase("save"):
+            question.save_result(is_ok)
+            self.corpus.events.append(question.item.id, question.field[0], is_ok, ratio,
+                                      time.monotonic() - self._shown_at, self.help_shown,
+                                      question.choices is not None and response.strip().isdecimal())
+        if is_ok:
+            self.good_answer = self.good_answer + 1
+        else:
+            self.bad_answer = self.bad_answer + 1
+            failure = self.failed_questions.setdefault(
+                question,
+                {"question_number": question_number, "attempts": []},
+            )
+            failure["attempts"].append((response, ratio))
+        self.score = self.score + (0.0 if ratio is None else ratio)
+        self.last_question = question
+        self.current = None
+        with instrumentation.phase("draw"):
+            self._answered(question, is_ok)
+            if is_ok:
+                self._append_next_question()
+            else:
+                self._subgroup.append((question, True, question_number))
+        return Answer(question, response, is_ok, ratio, graded=True, help_used=self.help_shown)
+
+    def _answered(self, question: Question, is_ok: bool) -> None:
+        """Called once an answer is graded and saved, before the next question is drawn."""
+
+    @staticmethod
+    def choose_word_block(session: "Session", block_size: int = BLOCK_SIZE) -> int | None:
+        block_count = session.word_block_count(block_size)
+        if block_count <= 1 or not session.USES_BLOCKS:
+            return None
 
-        block_count = (len(self.questions_word) + block_size - 1) // block_size
         while True:
             choice = input(
-                f"{len(self.questions_word)} word questions found "
+                f"{len(session.questions_word)} word questions found "
                 f"({block_count} blocks of up to {block_size}). "
                 f"Choose a block (1-{block_count}): "
             ).strip()
@@ -302,9 +941,7 @@ class Session(ABC):
                 block_number = 0
 
             if 1 <= block_number <= block_count:
-                start = (block_number - 1) * block_size
-                self.questions_word = self.questions_word[start:start + block_size]
-                return
+                return block_number
 
             print(f"Please choose a number from 1 to {block_count}.")
 
@@ -333,73 +970,115 @@ class Session(ABC):
             print(f"Please choose {', '.join(exercise_choices)}.")
 
     @staticmethod
-    def build_session() -> "Session":
-        mode = input("What do you want to learn : Vocabulary (v), Top used verbs (t) or Interview (i) ?")
+    def choose_choice_count() -> int | None:
+        while True:
+            choice = input("Type the answers (Enter) or choose among several (number of answers, e.g. 4) ?").strip()
+            if not choice:
+                return None
+            if choice.isdecimal() and int(choice) in CHOICE_COUNTS:
+                return int(choice)
+            print(f"Please press Enter or choose a number from {CHOICE_COUNTS[0]} to {CHOICE_COUNTS[-1]}.")
 
+    @staticmethod
+    def from_options(corpus: Corpus, mode: str = "v", test: str = "w", pos: str = "all",
+                     word_field: tuple[str, list[str], list[str]] | None = None,
+                     jlpt_levels: list[int] | None = None) -> "Session":
+        """Session for the answers build_session() would collect: mode v/t/i/r/e,
+        test k/w/b, pos a POS_CHOICES key, jlpt_levels None for all."""
         if mode == "i":
-            jlpt_input = input("What JLPT level to review : All (a|all), or one/several levels (e.g. 1, 1 2, 2 4 5) ?")
-            jlpt_levels = None if (jlpt_input.strip().lower() == "all" or jlpt_input.strip().lower() == "a") else [int(level) for level in jlpt_input.split()]
-            return SessionTags(jlpt_levels, "interview", Session.choose_word_field())
-
+            return SessionTags(corpus, jlpt_levels, "interview", word_field)
         if mode == "t":
-            jlpt_input = input("What JLPT level to review : All (all), or one/several levels (e.g. 1, 1 2, 2 4 5) ?")
-            jlpt_levels = None if jlpt_input.strip().lower() == "all" else [int(level) for level in jlpt_input.split()]
-            return SessionTags(jlpt_levels, "top_used_verbs", Session.choose_word_field())
-
-        r = input("What test : Kanji (k), Word (w), Both (b) ?")
-        kind = None
-        if r in ["w", "b"]:
-            pos = input("What kind of word : All (all), Adjective (adj), Noun (noun), Adverb (adv), Verb (verb) ?")
-            kind = POS_CHOICES.get(pos)
-
-        word_field = None
-        if r in ["w", "b"]:
-            word_field = Session.choose_word_field()
-
-        jlpt_input = input("What JLPT level to review : All (all), or one/several levels (e.g. 1, 1 2, 2 4 5) ?")
-        jlpt_levels = None if jlpt_input.strip().lower() == "all" else [int(level) for level in jlpt_input.split()]
-        return SessionVocabulary(jlpt_levels, r, kind, word_field)
-
-    def ask(self, subgroup_size: int = 4):
-        if subgroup_size < 1:
-            raise ValueError("subgroup_size must be greater than zero")
+            return SessionTags(corpus, jlpt_levels, "top_used_verbs", word_field)
+        kind = POS_CHOICES.get(pos) if test in ["w", "b"] else None
+        if mode == "e":
+            return SessionWeighted(corpus, jlpt_levels, test, kind, word_field if test in ["w", "b"] else None)
+        if mode == "r":
+            return SessionReview(corpus, jlpt_levels, test, kind, word_field if test in ["w", "b"] else None)
+        return SessionVocabulary(corpus, jlpt_levels, test, kind, word_field if test in ["w", "b"] else None)
 
-        next_question_number = 1
-        subgroup = deque()
-
-        def append_next_question() -> bool:
-            nonlocal next_question_number
-            if not self.questions_word and not self.questions_kanji:
-                return False
-
-            index = random.randint(0, len(self.questions_word) + len(self.questions_kanji) - 1)
-            if index < len(self.questions_word):
-                subgroup.append((self.questions_word.pop(), False, next_question_number))
-                self._pending_questions_word += 1
-            else:
-                subgroup.append((self.questions_kanji.pop(), False, next_question_number))
-                self._pending_questions_kanji += 1
-            next_question_number += 1
-            return True
+    @staticmethod
+    def build_session(corpus: Corpus, listing: bool = False) -> "Session":
+        """Started session for the answers of the terminal prompts. listing:
+        the session only lists its words (generate_jlpt_pdf.py), so neither
+        the modes that draw questions as they go (r, e) nor multiple choice
+        are offered."""
+        if listing:
+            mode = input("What do you want to list : Vocabulary (v), Top used verbs (t) or Interview (i) ?")
+            while mode not in ["v", "t", "i"]:
+                mode = input("Please choose v, t or i: ")
+        else:
+            mode = input("What do you want to learn : Vocabulary (v), Top used verbs (t), Interview (i), "
+                         "Review what is due (r) or Work on your mistakes (e) ?")
 
-        while len(subgroup) < subgroup_size and append_next_question():
-            pass
+        if mode in ["i", "t"]:
+            jlpt_input = input("What JLPT level to review : All (a|all), or one/several levels (e.g. 1, 1 2, 2 4 5) ?")
+            session = Session.from_options(corpus, mode, word_field=Session.choose_word_field(),
+                                           jlpt_levels=parse_jlpt_levels(jlpt_input))
+            if not listing:
+                session.choice_count = Session.choose_choice_count()
+        else:
+            r = input("What test : Kanji (k), Word (w), Both (b) ?")
+            pos = "all"
+            if r in ["w", "b"]:
+                pos = input("What kind of word : All (all), Adjective (adj), Noun (noun), Adverb (adv), Verb (verb) ?")
 
-        while subgroup:
-            question, is_retry, question_number = subgroup.popleft()
-            if not is_retry:
-                if isinstance(question.item, Word):
-                    self._pending_questions_word -= 1
-                else:
-                    self._pending_questions_kanji -= 1
+            word_field = None
+            if r in ["w", "b"]:
+                word_field = Session.choose_word_field()
 
-            should_continue, is_correct = self.ask_question(question_number, question)
-            if not should_continue:
+            jlpt_input = input("What JLPT level to review : All (all), or one/several levels (e.g. 1, 1 2, 2 4 5) ?")
+            session = Session.from_options(corpus, mode, r, pos, word_field, parse_jlpt_levels(jlpt_input))
+            if r in ["w", "b"] and not listing:
+                session.choice_count = Session.choose_choice_count()
+
+        block = Session.choose_word_block(session)
+        with instrumentation.phase("start"):
+            session.start(block)
+        return session
+
+    def prompt_prefix(self) -> str:
+        question, question_number = self.current
+        remaining_kanji, remaining_word = self.remaining()
+        return f"[{str(question_number)}/{self.questions_length_initial} (k:{str(remaining_kanji)}/{str(self.questions_kanji_length_initial)}, w:{str(remaining_word)}/{str(self.questions_word_length_initial)}) JLPT:{question.jlpt()}]"
+
+    def ask(self, record: TextIO | None = None):
+        """Run the session in the terminal, writing every input to record
+        as a JSON line when given."""
+        while (question := self.next_question()) is not None:
+            with instrumentation.phase("render"):
+                question.ask(self.prompt_prefix())
+            while True:
+                with instrumentation.phase("input"):
+                    response = input(f"{Fore.BLUE}")
+                    print(Fore.RESET, end="")
+                    if record is not None:
+                        record.write(json.dumps({"input": response}, ensure_ascii=False) + "\n")
+                message = self.command(response)
+                if message is not None:
+                    if not self.stopped:
+                        with instrumentation.phase("render"):
+                            print(message)
+                            if self.help_shown:
+                                question.help()
+                            else:
+                                question.ask(self.prompt_prefix())
+                        continue
+                    break
+                answer = self.submit(response)
+                with instrumentation.phase("render"):
+                    if not answer.graded:
+                        question.help()
+                        continue
+                    if answer.is_ok:
+                        question.success(answer.ratio)
+                    else:
+                        question.error(answer.ratio)
+                        if not answer.help_used and not isinstance(question.item, Word):
+                            question.help()
+                    print("")
+                break
+            if self.stopped:
                 break
-            if is_correct:
-                append_next_question()
-            else:
-                subgroup.append((question, True, question_number))
 
         # we print the stat :
         total_answer = self.good_answer + self.bad_answer
@@ -435,256 +1114,290 @@ class Session(ABC):
                 print(f"   Try {attempt_number}: {displayed_response} (score: {ratio})")
             print(f"   Try {len(attempts) + 1}: {expected_answer} (correct)")
 
-    def ask_question(self, index: int, question: Question) -> tuple[bool, bool]:
-        parser = argparse.ArgumentParser()
-        parser.add_argument('-f', type=str, nargs="+", help="Forbid a description of sentence from a solution.")
-        parser.add_argument('-a', type=str, nargs="+", help="Add a description of sentence for a solution.")
-        parser.add_argument('-b', action='store_true', help="Burn the last question.")
-        parser.add_argument('-u', action='store_true', help="Unburn the last question.")
-        parser.add_argument('-r', action='store_true', help="Reset the last question.")
-        parser.add_argument('-s', action='store_true', help="Stop the session.")
-        flag = False
-        help = False
-        while True:
-            if not help:
-                remaining_kanji = len(self.questions_kanji) + self._pending_questions_kanji
-                remaining_word = len(self.questions_word) + self._pending_questions_word
-                question.ask(f"[{str(index)}/{self.questions_length_initial} (k:{str(remaining_kanji)}/{str(self.questions_kanji_length_initial)}, w:{str(remaining_word)}/{str(self.questions_word_length_initial)}) JLPT:{question.jlpt()}]")
-            if help:
-                question.help()
-            flag = False
-            response = input(f"{Fore.BLUE}")
-            print(Fore.RESET, end="")
-            args, unknown = parser.parse_known_args(response.split())
-            if args.f is not None:
-                flag = True
-                if self.last_question is None:
-                    print("No previous word")
-                else:
-                    self.last_question.add_forbid(' '.join(args.f))
-            elif args.a is not None:
-                flag = True
-                if self.last_question is None:
-                    print("No previous word")
-                else:
-                    self.last_question.add_meaning(' '.join(args.a))
-            elif args.b:
-                flag = True
-                self.last_question.burn()
-            elif args.u:
-                flag = True
-                self.last_question.unburn()
-            elif args.r:
-                flag = True
-                self.last_question.reset()
-            elif args.s:
-                return False, False
-            elif response == "":
-                # Print help
-                if help:
-                    break
-                else:
-                    if question.is_help():
-                        help = True
-                    else:
-                        break
-            else:
-                break
-        is_ok, ratio = question.check_solution(response)
-        if is_ok:
-            question.save_result(is_ok)
-            question.success(ratio)
-            self.good_answer = self.good_answer + 1
-        else:
-            question.error(ratio)
-            if not help and not isinstance(question.item, Word):
-                question.help()
-            self.bad_answer = self.bad_answer + 1
-            failure = self.failed_questions.setdefault(
-                question,
-                {"question_number": index, "attempts": []},
-            )
-            failure["attempts"].append((response, ratio))
-        self.score = self.score + (0.0 if ratio is None else ratio)
-        print("")
-        self.last_question = question
-        return True, is_ok
-
 
 class SessionVocabulary(Session):
-    def __init__(self, jlpt_levels: list[int] | None, test: str, kind: str = None,
+    def __init__(self, corpus: Corpus, jlpt_levels: list[int] | None, test: str, kind: str = None,
                  word_field=None):
         self.jlpt_levels = jlpt_levels
         self.test = test
         self.kind = kind
         self.word_field = word_field
-        super().__init__()
+        super().__init__(corpus)
 
     def _build_questions(self) -> None:
         if self.test in ["w", "b"]:
-            for word in words[:]:
-                if self.jlpt_levels is None or word.jlpt() in self.jlpt_levels:
-                    if self.kind is not None and self.kind not in word.kinds:
-                        continue
-                    try:
-                        self.questions_word.append(Question(word, self.word_field))
-                    except:
-                        pass # This item is burned.
+            self._build_word_questions(self.corpus.word_index.find(self.jlpt_levels, kind=self.kind),
+                                       self.word_field)
         if self.test in ["k", "b"]:
-            for kanji in kanjis.values():
-                if self.jlpt_levels is None or kanji.jlpt() in self.jlpt_levels:
-                    try:
-                        self.questions_kanji.append(Question(kanji))
-                    except:
-                        pass # This item is burned.
+            burned = self.corpus.burns('meanings')
+            self.questions_kanji = [Question(self.corpus, kanji)
+                                    for kanji in self.corpus.kanji_index.find(self.jlpt_levels)
+                                    if kanji.id not in burned]
+
+
+class SessionReview(SessionVocabulary):
+    """The selection of a vocabulary session, without blocks: items due for
+    review first (oldest due time first), then up to new_limit items never
+    reviewed, easiest JLPT level first. The first answer to each item
+    reschedules it."""
+
+    USES_BLOCKS = False
+    NEW_LIMIT = 20
+
+    def __init__(self, corpus: Corpus, jlpt_levels: list[int] | None, test: str, kind: str = None,
+                 word_field=None, new_limit: int = NEW_LIMIT, clock: Callable[[], float] = time.time):
+        self.new_limit = new_limit
+        self.clock = clock
+        self.due_queue = DueQueue()
+        self._new_left = 0
+        self._left_word = 0
+        self._left_kanji = 0
+        self._reviewed = set()
+        super().__init__(corpus, jlpt_levels, test, kind, word_field)
+
+    def start(self, block: int | None = None, block_size: int = Session.BLOCK_SIZE, subgroup_size: int = 4,
+              seed: int | None = None) -> None:
+        if seed is not None:
+            self.random.seed(seed)
+        if subgroup_size < 1:
+            raise ValueError("subgroup_size must be greater than zero")
+        now = self.clock()
+        questions = sorted(self.questions_kanji + self.questions_word,
+                           key=lambda question: (-(question.jlpt() or 0), question.item.index))
+        new_questions = []
+        for question in questions:
+            state = self.corpus.schedule(question.field[0]).get(question.item.id)
+            self.due_queue.add(question, state)
+            if state is None:
+                new_questions.append(question)
+        self.due_queue.heapify()
+        self.questions_word = []
+        self.questions_kanji = []
+
+        self._new_left = min(self.new_limit, len(new_questions))
+        for question in self.due_queue.due_items(now) + new_questions[:self._new_left]:
+            if isinstance(question.item, Word):
+                self._left_word += 1
+            else:
+                self._left_kanji += 1
+        self.questions_word_length_initial = self._left_word
+        self.questions_kanji_length_initial = self._left_kanji
+        self.questions_length_initial = self._left_word + self._left_kanji
+        self._subgroup_size = subgroup_size
+
+    def _append_next_question(self) -> bool:
+        question = self.due_queue.pop_due(self.clock())
+        if question is None and self._new_left > 0:
+            question = self.due_queue.pop_new()
+            self._new_left -= 1
+        if question is None:
+            return False
+        self._subgroup.append((question, False, self._next_question_number))
+        if isinstance(question.item, Word):
+            self._pending_questions_word += 1
+            self._left_word = max(self._left_word - 1, 0)
+        else:
+            self._pending_questions_kanji += 1
+            self._left_kanji = max(self._left_kanji - 1, 0)
+        self._next_question_number += 1
+        return True
+
+    def remaining(self) -> tuple[int, int]:
+        return (self._left_kanji + self._pending_questions_kanji,
+                self._left_word + self._pending_questions_word)
+
+    def submit(self, response: str) -> Answer:
+        answer = super().submit(response)
+        question = answer.question
+        if answer.graded and question not in self._reviewed:
+            self._reviewed.add(question)
+            with instrumentation.phase("save"):
+                schedule = self.corpus.schedule(question.field[0])
+                grade = quality(answer.is_ok, answer.ratio, answer.help_used)
+                now = self.clock()
+                schedule.update(question.item.id, lambda state: review(state, grade, now))
+        return answer
+
+
+class SessionWeighted(SessionVocabulary):
+    """The selection of a vocabulary session, without blocks: length
+    questions drawn at random, each with a probability following its
+    error rate and how long ago it was last answered, so weak items come
+    up more often. A question can be drawn again once answered right; its
+    weight is then recomputed in O(log n)."""
+
+    USES_BLOCKS = False
+    LENGTH = 30
+
+    def __init__(self, corpus: Corpus, jlpt_levels: list[int] | None, test: str, kind: str = None,
+                 word_field=None, length: int = LENGTH):
+        self.length = length
+        self.pool: list[Question] = []
+        self.weights: FenwickTree | None = None
+        self._positions: dict[Question, int] = {}
+        self._draws_left = 0
+        # Draws still to come are counted as words, unless the pool holds kanji only.
+        self._draws_are_words = True
+        super().__init__(corpus, jlpt_levels, test, kind, word_field)
+
+    def start(self, block: int | None = None, block_size: int = Session.BLOCK_SIZE, subgroup_size: int = 4,
+              seed: int | None = None) -> None:
+        if seed is not None:
+            self.random.seed(seed)
+        if subgroup_size < 1:
+            raise ValueError("subgroup_size must be greater than zero")
+        now = time.time()
+        self.pool = self.questions_kanji + self.questions_word
+        self._positions = {question: position for position, question in enumerate(self.pool)}
+        self.weights = FenwickTree([question.error_weight(now) for question in self.pool])
+        self._draws_are_words = bool(self.questions_word)
+        self.questions_word = []
+        self.questions_kanji = []
+        self._draws_left = self.length if self.pool else 0
+        self.questions_length_initial = self._draws_left
+        self.questions_word_length_initial = self._draws_left if self._draws_are_words else 0
+        self.questions_kanji_length_initial = 0 if self._draws_are_words else self._draws_left
+        self._subgroup_size = subgroup_size
+
+    def _append_next_question(self) -> bool:
+        if self._draws_left <= 0:
+            return False
+        position = self.weights.draw(self.random)
+        if position is None:
+            return False
+        question = self.pool[position]
+        # Out of the draw while it is being asked.
+        self.weights.update(position, 0.0)
+        self._subgroup.append((question, False, self._next_question_number))
+        is_word = isinstance(question.item, Word)
+        if is_word:
+            self._pending_questions_word += 1
+        else:
+            self._pending_questions_kanji += 1
+        if is_word != self._draws_are_words:
+            # Counted in the initial length of the other kind until drawn.
+            shift = 1 if is_word else -1
+            self.questions_word_length_initial += shift
+            self.questions_kanji_length_initial -= shift
+        self._draws_left -= 1
+        self._next_question_number += 1
+        return True
+
+    def remaining(self) -> tuple[int, int]:
+        """Pending kanji and word questions; draws still to come are counted
+        as words, or as kanji when the pool holds kanji only."""
+        if self._draws_are_words:
+            return self._pending_questions_kanji, self._pending_questions_word + self._draws_left
+        return self._pending_questions_kanji + self._draws_left, self._pending_questions_word
+
+    def _answered(self, question: Question, is_ok: bool) -> None:
+        # Back in the draw with its new weight before the next question is drawn.
+        if is_ok:
+            self.weights.update(self._positions[question], question.error_weight(time.time()))
 
 
 class SessionTags(Session):
-    def __init__(self, jlpt_levels: list[int] | None, tag: str, word_field: tuple[str, list[str], list[str]]):
+    def __init__(self, corpus: Corpus, jlpt_levels: list[int] | None, tag: str,
+                 word_field: tuple[str, list[str], list[str]]):
         self.jlpt_levels = jlpt_levels
         self.tag = tag
         self.word_field = word_field
-        super().__init__()
+        super().__init__(corpus)
 
     def _build_questions(self) -> None:
-        for word in words[:]:
-            if self.tag not in word.tags:
-                continue
-            if self.jlpt_levels is not None and word.jlpt() not in self.jlpt_levels:
-                continue
-            try:
-                self.questions_word.append(Question(word, self.word_field))
-            except:
-                pass # This item is burned.
-
-
-def load_kanji() -> dict[str, Kanji]:
-    kanjis = {}
-    file_path = Path("kanji.json")
-    with open(file_path, "r", encoding="utf-8") as f:
-        index = 0
-        for kanji, info in json.load(f).items():
-            kanjis[kanji] = Kanji(index, kanji, info)
-            index = index + 1
-    return kanjis
-
-
-words = []
-kanjis = load_kanji()
-
-
-with open('all_hiragana_with_pos.csv', newline='', encoding='utf-8') as csvfile:
-    reader = csv.reader(csvfile)
-    next(reader)  # Ignore la première ligne (en-tête)
-    index = 0
-    for row in reader:
-        # row = [expression, reading, romaji, meaning, tags, kinds, tags]
-        index = index + 1
-        if len(row) != 8:
-            raise Exception("Malformed line : " + str(row))
-        word = Word(index - 1, *row)
-        words.append(word)
-
-try:
-    path = Path("overlay_forbid_meaning.txt")
-    index = 0
-    with path.open("r", encoding="utf-8") as f:
-        for line in f.readlines():
-            line = line.strip()
-            words[index].forbid_meaning = line
-            index = index + 1
-except:
-    print("Err")
-
-try:
-    path = Path("overlay_response_meaning.txt")
-    index = 0
-    with path.open("r", encoding="utf-8") as f:
-        for line in f.readlines():
-            line = line.strip()
-            words[index].overlay_meaning = line
-            index = index + 1
-except:
-    print("Err")
-
-
-try:
-    path = Path("burn_meaning.txt")
-    lines = []
-
-    if path.exists():
-        with path.open("r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines()]
-
-    for index in range(len(lines)):
-        words[index].burn_meaning = lines[index] == 'o'
-except:
-    print("Err")
-
-
-try:
-    path = Path("burn_romaji.txt")
-    lines = []
-
-    if path.exists():
-        with path.open("r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines()]
-
-    for index in range(len(lines)):
-        words[index].burn_romaji = lines[index] == 'o'
-except:
-    print("Err")
-
-
-try:
-    path = Path("burn_meanings.txt")
-    lines = []
-
-    if path.exists():
-        with path.open("r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines()]
-
-    for index in range(len(lines)):
-        kanjis[list(kanjis.keys())[index]].burn_meanings = lines[index] == 'o'
-except:
-    print("Err")
+        self._build_word_questions(self.corpus.word_index.find(self.jlpt_levels, tag=self.tag), self.word_field)
 
 
 def check_field(response: str, solutions: list[str], forbids: list[str], should_be_exact: bool) -> (bool, float | None):
-    ration_response_limit = 1.0 if should_be_exact else 0.6
-    ratio_resonse = 0.0
-    ratio_forbid_resonse = 0.0
-    for solution in solutions:
-        tmp_ratio_resonse = SequenceMatcher(None, solution, response).ratio()
-        ratio_resonse = tmp_ratio_resonse if tmp_ratio_resonse > ratio_resonse else ratio_resonse
-    for forbid in forbids:
-        tmp_ratio_resonse = SequenceMatcher(None, forbid, response).ratio()
-        ratio_forbid_resonse = tmp_ratio_resonse if tmp_ratio_resonse > ratio_forbid_resonse else ratio_forbid_resonse
-    return (False if ratio_forbid_resonse > 0.85 else ratio_resonse >= ration_response_limit,
-            0.0 if ratio_forbid_resonse > 0.85 else ratio_resonse)
-
-
-def _add_entry_file(index: int, text: str, file: str):
-    path = Path(file)
-    lines = []
+    return Grader(solutions, forbids, should_be_exact).grade(response)
 
-    if path.exists():
-        with path.open("r", encoding="utf-8") as f:
-            lines = [line.strip() for line in f.readlines()]
 
-    while len(lines) <= index:
-        lines.append("")
+def check_fields(cases: list[tuple[str, list[str], list[str], bool]]) -> list[tuple[bool, float | None]]:
+    """check_field(*case) for every case, graded as one batch."""
+    return grade_batch(cases)
 
-    if lines[index] != "":
-        lines[index] = lines[index] + ";"
-    lines[index] = text
 
-    with path.open("w", encoding="utf-8") as f:
-        for line in lines:
-            f.write(line + "\n")
+def check_solutions(answers: list[tuple[Question, str]]) -> list[tuple[bool, float | None]]:
+    """question.check_solution(response) for every (question, response):
+    chosen answer numbers included, through the graders cached by the
+    corpus, so a response repeated for the same question is graded once;
+    progress is not saved."""
+    return [question.check_solution(response) for question, response in answers]
 
 
-def list_kanji(text: str) -> list[Kanji]:
+def format_matches(matches: list[tuple[float, Kanji | Word, str, str]]) -> str:
+    if not matches:
+        return "No match."
+    lines = []
+    for score, item, source, text in matches:
+        details = f"{item.kana}, {item.meaning}" if isinstance(item, Word) else item.meanings
+        lines.append(f"{score:.2f} {item} ({details}) - {source}: {text}")
+    return "\n".join(lines)
+
+
+def _parse_legacy_burn(line: str) -> bool | None:
+    return True if line == "o" else None
+
+
+def _parse_legacy_result(line: str) -> int | None:
+    try:
+        return int(line)
+    except ValueError:
+        return None
+
+
+def create_session(corpus: Corpus, options: dict) -> Session:
+    """Started session for options, the answers of the terminal prompts as
+    a dict: mode, test, pos, exercise (1-based, None for every field), jlpt
+    ("all", "5 4" or a list), block, subgroup_size, seed and choices (number
+    of answers offered by word questions, None for free text), all optional."""
+    exercise = options.get("exercise", 1)
+    if exercise is not None and not 1 <= int(exercise) <= len(Word.fields()):
+        raise ValueError(f"exercise must be from 1 to {len(Word.fields())}: {exercise}")
+    word_field = None if exercise is None else Word.fields()[int(exercise) - 1]
+    choices = options.get("choices")
+    choices = None if choices is None else int(choices)
+    if choices is not None and choices not in CHOICE_COUNTS:
+        raise ValueError(f"choices must be from {CHOICE_COUNTS[0]} to {CHOICE_COUNTS[-1]}: {choices}")
+    jlpt = options.get("jlpt", "all")
+    jlpt_levels = parse_jlpt_levels(jlpt) if isinstance(jlpt, str) else [int(level) for level in jlpt]
+    session = Session.from_options(corpus, options.get("mode", "v"), options.get("test", "w"),
+                                   options.get("pos", "all"), word_field, jlpt_levels)
+    session.choice_count = choices
+    block = options.get("block")
+    seed = options.get("seed")
+    with instrumentation.phase("start"):
+        session.start(None if block is None else int(block), subgroup_size=int(options.get("subgroup_size", 4)),
+                      seed=None if seed is None else int(seed))
+    return session
+
+
+def add_session_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options of create_session() as command line flags."""
+    parser.add_argument("--mode", choices=["v", "t", "i", "r", "e"],
+                        help="vocabulary, top used verbs, interview, review what is due or work on mistakes")
+    parser.add_argument("--test", choices=["k", "w", "b"], default="w", help="kanji, words or both")
+    parser.add_argument("--pos", choices=list(POS_CHOICES), default="all")
+    parser.add_argument("--exercise", type=int, choices=range(1, len(Word.fields()) + 1), default=1)
+    parser.add_argument("--jlpt", default="all", help="'all' or levels, e.g. '5 4'")
+    parser.add_argument("--block", type=int, help="block of 15 words (default: every word)")
+    parser.add_argument("--seed", type=int, help="question order")
+    parser.add_argument("--choices", type=int, choices=CHOICE_COUNTS, metavar="N",
+                        help="multiple choice word questions with N answers (default: free text)")
+
+
+def session_options(args: argparse.Namespace) -> dict:
+    return {"mode": args.mode, "test": args.test, "pos": args.pos, "exercise": args.exercise,
+            "jlpt": args.jlpt, "block": args.block, "seed": args.seed, "choices": args.choices}
+
+
+def parse_jlpt_levels(text: str) -> list[int] | None:
+    text = text.strip().lower()
+    return None if text in ["a", "all"] else [int(level) for level in text.split()]
+
+
+def list_kanji(corpus: Corpus, text: str) -> list[Kanji]:
+    kanjis = corpus.kanjis
     tmp_kanjis = []
     for letter in text:
         if letter in kanjis:
@@ -693,15 +1406,11 @@ def list_kanji(text: str) -> list[Kanji]:
 
 
 def is_katakana_present(text: str):
-    katakana = "ァアィイゥウェエォオカガキギクグケゲコゴサザシジスズセゼソゾタダチヂッツヅテデトドナニヌネノハバパヒビピフブプヘベペホボポマミムメモャヤュユョヨラリルレロヮワヰヱヲンヴヵヶー・ヽヾ"
-    for character in text:
-        if character in katakana:
-            return True
-    return False
+    return has_katakana(text)
 
 
-def is_kanji_present(text: str) -> bool:
-    return len(list_kanji(text)) != 0
+def is_kanji_present(corpus: Corpus, text: str) -> bool:
+    return len(list_kanji(corpus, text)) != 0
 
 
 POS_CHOICES = {
@@ -714,8 +1423,54 @@ POS_CHOICES = {
 
 
 def main():
-    session = Session.build_session()
-    session.ask()
+    parser = argparse.ArgumentParser(description="Train on JLPT words and kanji. Without --mode, "
+                                                 "the session is set up by answering prompts.")
+    add_session_arguments(parser)
+    parser.add_argument("--record", type=Path, help="append the session options and every input to this "
+                                                    "JSON lines file (for loadgen.py --replay)")
+    parser.add_argument("--trace", type=Path, help="time startup and every turn by phase, print a summary at the "
+                                                   "end and write the trace to this JSON file")
+    parser.add_argument("--profile", choices=instrumentation.PROFILERS,
+                        help="also run this profiler for the whole session (summary and trace)")
+    parser.add_argument("--learner", help=f"keep the progress in the profile of this learner "
+                                          f"({PROGRESS_DIR}/{PROFILES_DIR}/<learner>) instead of {PROGRESS_DIR}")
+    args = parser.parse_args()
+    if args.learner is not None and not PROFILE_PATTERN.fullmatch(args.learner):
+        parser.error("--learner: letters, digits, '_' and '-' only, up to 64")
+    if args.record is not None:
+        if args.mode is None:
+            parser.error("--record needs the session options (--mode ...)")
+        if args.seed is None:
+            # Replaying the inputs only makes sense with the same question order.
+            args.seed = random.randrange(2 ** 32)
+
+    if args.trace is None and args.profile is None:
+        run(args)
+        return
+    trace = instrumentation.Trace(args.profile)
+    instrumentation.activate(trace)
+    try:
+        run(args)
+    finally:
+        instrumentation.deactivate()
+        print(trace.summary())
+        if args.trace is not None:
+            trace.export(args.trace)
+
+
+def run(args: argparse.Namespace) -> None:
+    corpus = Corpus(profile=args.learner)
+    if args.mode is None:
+        Session.build_session(corpus).ask()
+        return
+    options = session_options(args)
+    session = create_session(corpus, options)
+    if args.record is None:
+        session.ask()
+        return
+    with open(args.record, "a", encoding="utf-8") as record:
+        record.write(json.dumps({"options": options}, ensure_ascii=False) + "\n")
+        session.ask(record)
 
 
 if __name__ == '__main__':